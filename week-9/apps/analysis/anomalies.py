@@ -1,18 +1,133 @@
-import sys, pandas as pd, numpy as np
+import os, sys, pandas as pd, numpy as np
+from store import read_log, iter_log, CHUNK_ROWS
+from rules import HI_THRESHOLD, S1_WINDOW_S, F1_WINDOW_S, F1_MARGIN, make_rules, RULES   # shared with the live logger
 
-HI_THRESHOLD = 28.0
-S1_WINDOW_S  = 600     # 10 min
-F1_WINDOW_S  = 300     # 5 min
-F1_MARGIN    = 0.005   # add-on over per-session median (tune)
-
-def load_sessions_csv(path):
-    df = pd.read_csv(path)
-    if "session_id" not in df.columns:
-        raise SystemExit("Please run sessionizer.py first to create session_id.")
+def load_sessions_csv(*paths):
+    frames = []
+    for path in paths:
+        df = read_log(path)
+        if "session_id" not in df.columns:
+            raise SystemExit("Please run sessionizer.py first to create session_id.")
+        if len(paths) > 1:
+            # session ids restart every day, keep them apart
+            df["day"] = os.path.basename(path).split(".")[0]
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
     df["ms"] = pd.to_numeric(df["ms"], errors="coerce")
     df["sec"] = df["ms"]/1000.0
     return df
 
+def iter_sessions_csv(*paths, rules=RULES, chunksize=CHUNK_ROWS):
+    """
+    load_sessions_csv() as chunks, reading only the columns `rules` need; a
+    "day" column is added when several files are given, like the full loader.
+    """
+    cols = ["iso_ts", "ms", "session_id"] + sorted({r["col"] for r in rules})
+    for path in paths:
+        if "session_id" not in pd.read_csv(path, nrows=0).columns:
+            raise SystemExit("Please run sessionizer.py first to create session_id.")
+        for df in iter_log(path, columns=cols, chunksize=chunksize):
+            if len(paths) > 1:
+                df["day"] = os.path.basename(path).split(".")[0]
+            df["ms"] = pd.to_numeric(df["ms"], errors="coerce")
+            df["sec"] = df["ms"]/1000.0
+            yield df
+
+def find_anomalies_chunks(chunks, rules=RULES):
+    """
+    find_anomalies() over an iterable of chunks. Rows of the session still
+    open at the end of a chunk are carried into the next one, so every
+    session is evaluated whole (windows and medians as in one pass) while
+    memory holds one chunk plus at most one session.
+    """
+    carry = None
+    for df in chunks:
+        if carry is not None:
+            df = pd.concat([carry, df], ignore_index=True)
+        sid = df["session_id"].to_numpy()
+        key = sid if "day" not in df.columns else pd.factorize(df["day"].to_numpy())[0] * (int(sid.max(initial=0)) + 1) + sid
+        cut = len(df)
+        if len(df) and sid[-1] != 0:
+            other = np.flatnonzero(key != key[-1])
+            cut = other[-1] + 1 if len(other) else 0
+        carry = df.iloc[cut:] if cut < len(df) else None
+        if cut:
+            yield from find_anomalies(df.iloc[:cut].reset_index(drop=True), rules)
+    if carry is not None:
+        yield from find_anomalies(carry.reset_index(drop=True), rules)
+
+def _session_index(df):
+    """
+    Time index shared by all rules: positions of session rows in `df` ordered by
+    (day, session_id, sec), a group code per session and seconds since the
+    session's first sample. Skips the sort when the log is already in order.
+    """
+    sid = df["session_id"].to_numpy()
+    sec = df["sec"].to_numpy(dtype=float)
+    rows = np.flatnonzero((sid != 0) & ~np.isnan(sec))
+    sid, sec = sid[rows].astype(np.int64), sec[rows]
+    day = pd.factorize(df["day"].to_numpy()[rows], sort=True)[0] if "day" in df.columns else np.zeros(len(rows), dtype=np.int64)
+    g = day.astype(np.int64) * (int(sid.max(initial=0)) + 1) + sid
+    dg = np.diff(g)
+    if (dg < 0).any() or ((dg == 0) & (np.diff(sec) < 0)).any():
+        order = np.lexsort((sec, g))
+        rows, sec, g = rows[order], sec[order], g[order]
+        dg = np.diff(g)
+    first = np.r_[True, dg != 0][:len(rows)]
+    grp = np.cumsum(first) - 1
+    start = np.flatnonzero(first)
+    elapsed = sec - sec[start][grp]
+    return rows, grp, start, elapsed
+
+def _group_medians(values, start):
+    # rows are grouped contiguously, so each session is a slice
+    bounds = np.r_[start, len(values)]
+    return np.array([np.nanmedian(values[s:e]) if np.isfinite(values[s:e]).any() else np.nan
+                     for s, e in zip(bounds[:-1], bounds[1:])])
+
+def find_anomalies(df, rules=RULES):
+    rows, grp, start, elapsed = _session_index(df)
+    if not len(rows):
+        return []
+    # sessions laid end to end on one monotone time axis (with a gap wider than
+    # any window between them), so every rule is a plain time-based rolling mean
+    span = int((float(elapsed.max()) + max(r["window_s"] for r in rules) + 1.0) * 1e9)
+    t = pd.DatetimeIndex(grp.astype(np.int64) * span + np.round(elapsed * 1e9).astype(np.int64))
+
+    hits = []   # (session, rule index, row, window mean, threshold, session median)
+    for ri, rule in enumerate(rules):
+        w = rule["window_s"]
+        vals = df[rule["col"]].to_numpy(dtype=float)[rows]
+        roll = pd.Series(vals, index=t).rolling(f"{w}s").mean().to_numpy()
+        med = None
+        if "median_margin" in rule:
+            med = _group_medians(vals, start)[grp]
+            thr = med + rule["median_margin"]
+        else:
+            thr = np.full(len(rows), float(rule["threshold"]))
+        # only once the window is fully covered by the session
+        idx = np.flatnonzero((elapsed >= w) & (roll >= thr))
+        if len(idx):
+            idx = idx[np.r_[True, grp[idx[1:]] != grp[idx[:-1]]]]   # first per session
+        for i in idx:
+            hits.append((grp[i], ri, rows[i], roll[i], thr[i], None if med is None else med[i]))
+
+    events = []
+    for _, ri, r, val, thr, med in sorted(hits, key=lambda h: (h[0], h[1])):
+        rule = rules[ri]
+        row = df.iloc[r]
+        e = {"type": rule["type"], "session_id": int(row["session_id"])}
+        if "day" in df.columns:
+            e["day"] = row["day"]
+        ts = row["iso_ts"]
+        e["iso_ts"] = ts.isoformat() if hasattr(ts, "isoformat") else ts
+        e[rule["out"]] = round(float(val), rule["digits"])
+        if med is not None:
+            e["threshold"] = round(float(thr), rule["digits"])
+            e["session_median"] = round(float(med), rule["digits"])
+        events.append(e)
+    return events
+
 def rolling_by_seconds(df, col, window_s):
     # assume near-constant ~4Hz; convert to N samples
     # find median dt to infer Hz
@@ -20,7 +135,8 @@ def rolling_by_seconds(df, col, window_s):
     n = max(1, int(window_s / max(dt, 1e-6)))
     return df[col].rolling(window=n, min_periods=n).mean()
 
-def find_anomalies(df):
+def find_anomalies_loop(df):
+    # original per-session loop with sample-count windows (kept for benchmarking)
     events = []
     for sid, block in df.groupby("session_id"):
         if sid == 0: continue  # skip non-session
@@ -60,10 +176,13 @@ def find_anomalies(df):
     return events
 
 if __name__ == "__main__":
-    if len(sys.argv)<2:
-        print("Usage: python anomalies.py week-9/data/2025-09-25.sessions.csv")
+    paths = [a for a in sys.argv[1:] if a != "--chunked"]
+    if not paths:
+        print("Usage: python anomalies.py [--chunked] week-9/data/2025-09-25.sessions.csv [more.sessions.csv ...]")
         sys.exit(1)
-    df = load_sessions_csv(sys.argv[1])
-    events = find_anomalies(df)
+    if "--chunked" in sys.argv:
+        events = find_anomalies_chunks(iter_sessions_csv(*paths))
+    else:
+        events = find_anomalies(load_sessions_csv(*paths))
     for e in events:
         print(e)
@@ -0,0 +1,47 @@
+import sys, time, numpy as np, pandas as pd
+from anomalies import find_anomalies, find_anomalies_loop
+
+# usage: python bench_anomalies.py [DAYS ...]   (default: 1, 7 and 30 days)
+DAYS = [1, 7, 30]
+SESSIONS_PER_DAY = 12
+SESSION_MIN = 45
+DROP_P = 0.02   # fraction of serial samples lost
+SEED = 225
+
+def synth_days(days, seed=SEED):
+    """4 Hz session rows for `days` days, warm afternoons and a fidgety stretch per session."""
+    rng = np.random.default_rng(seed)
+    n_sess = days * SESSIONS_PER_DAY
+    per = int(SESSION_MIN * 60 * 4)
+    sid = np.repeat(np.arange(1, n_sess + 1), per)
+    t = np.tile(np.arange(per) * 0.25, n_sess) + (sid - 1) * 2 * 3600.0
+    hi = 25.0 + 4.0 * np.sin(np.linspace(0, days * np.pi, len(t))) + rng.normal(0, 0.3, len(t))
+    fid = np.abs(rng.normal(0.002, 0.0008, len(t)))
+    fid[(np.arange(len(t)) % per) > per * 0.7] += 0.01
+    keep = rng.random(len(t)) >= DROP_P
+    df = pd.DataFrame({
+        "iso_ts": pd.to_datetime(t[keep], unit="s").strftime("%Y-%m-%dT%H:%M:%S"),
+        "ms": (t[keep] * 1000).astype(np.int64),
+        "heat_index_c": hi[keep].round(2),
+        "fidget": fid[keep].round(4),
+        "session_id": sid[keep],
+    })
+    df["sec"] = df["ms"] / 1000.0
+    return df
+
+def timed(fn, df):
+    t0 = time.perf_counter()
+    ev = fn(df.copy())
+    return time.perf_counter() - t0, ev
+
+def main():
+    days = [int(a) for a in sys.argv[1:]] or DAYS
+    for n in days:
+        df = synth_days(n)
+        t_new, ev_new = timed(find_anomalies, df)
+        t_old, ev_old = timed(find_anomalies_loop, df)
+        print(f"days={n:>3}  rows={len(df):>10,}  engine={t_new:7.3f}s ({len(ev_new)} events)"
+              f"  per-session loop={t_old:7.3f}s ({len(ev_old)} events)  speedup={t_old / max(t_new, 1e-9):5.1f}x")
+
+if __name__ == "__main__":
+    main()
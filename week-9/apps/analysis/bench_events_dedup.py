@@ -0,0 +1,62 @@
+import sys, time, numpy as np, pandas as pd
+from events_dedup import dedup_mask, EventDeduper
+
+# usage: python bench_events_dedup.py [N ...]   (default: 1M events)
+SIZES = [1_000_000]
+LOOP_MAX = 200_000   # the df.loc loop takes minutes past this; skip it above
+CHUNK = 1_000        # rows per call for the streaming variant
+KEYS = ["type", "app"]
+SEED = 17
+
+def synth_events(n, seed=SEED):
+    """Bursty unlock/app_open stream: many repeats a few seconds apart, some NaN apps."""
+    rng = np.random.default_rng(seed)
+    gap_s = np.where(rng.random(n) < 0.4, rng.uniform(0, 12, n), rng.exponential(300, n))
+    t = pd.Timestamp("2025-09-25") + pd.to_timedelta(np.cumsum(gap_s), unit="s")
+    app = rng.choice(np.array(["", "instagram", "tiktok", "reddit", None], dtype=object), n,
+                     p=[0.4, 0.2, 0.2, 0.15, 0.05])
+    etype = np.where(pd.isna(app) | (app == ""), "unlock", "app_open")
+    return pd.DataFrame({"t": t, "type": etype, "app": app})
+
+def loop_mask(df):
+    """The original per-row loop from events_normalise.main (reference)."""
+    df = df.reset_index(drop=True)
+    keep = [True]
+    for i in range(1, len(df)):
+        same = (df.loc[i,"type"] == df.loc[i-1,"type"]) and (df.loc[i,"app"] == df.loc[i-1,"app"])
+        gap = (df.loc[i,"t"] - df.loc[i-1,"t"]).total_seconds()
+        keep.append(not (same and gap < 10))
+    return np.array(keep)
+
+def streamed_mask(df):
+    d = EventDeduper(KEYS)
+    kept = [d.filter(df.iloc[a:a + CHUNK]).index for a in range(0, len(df), CHUNK)]
+    return df.index.isin(np.concatenate(kept))
+
+def timed(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df)
+    return time.perf_counter() - t0, out
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    for n in sizes:
+        df = synth_events(n)
+        t_vec, m_vec = timed(lambda d: dedup_mask(d, KEYS), df)
+        t_str, m_str = timed(streamed_mask, df)
+        same = np.array_equal(m_vec, m_str)
+        line = (f"n={n:>10,}  vectorized={t_vec:7.3f}s  streamed({CHUNK}/call)={t_str:7.3f}s"
+                f"  kept={int(m_vec.sum()):,}  streamed_identical={same}")
+        if n <= LOOP_MAX:
+            t_loop, m_loop = timed(loop_mask, df)
+            ok = np.array_equal(m_vec, m_loop)
+            line += f"  loop={t_loop:7.2f}s  speedup={t_loop / max(t_vec, 1e-9):7.1f}x  identical={ok}"
+            same &= ok
+        else:
+            line += f"  loop=skipped (n > LOOP_MAX={LOOP_MAX:,})"
+        print(line)
+        if not same:
+            raise SystemExit("keep-mask mismatch between implementations")
+
+if __name__ == "__main__":
+    main()
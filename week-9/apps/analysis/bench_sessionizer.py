@@ -0,0 +1,49 @@
+import sys, time, numpy as np, pandas as pd
+from sessionizer import add_sessions, add_sessions_loop
+
+# usage: python bench_sessionizer.py [N ...]   (default: 1M and 10M rows)
+SIZES = [1_000_000, 10_000_000]
+LOOP_MAX = 1_000_000   # iterrows reference is ~minutes past this; skip it above
+SEED = 225
+
+def synth_rows(n, seed=SEED):
+    """~4 Hz log with jittered/dropped samples and mixed short/long occupancy runs."""
+    rng = np.random.default_rng(seed)
+    step = rng.choice([250, 250, 250, 249, 251, 500, 1000], size=n)  # ms, incl. drops
+    ms = 24_948_318 + np.cumsum(step)
+    # alternate runs: short blips (< START_HOLD_S) and long stays / absences
+    lens = np.where(rng.random(n // 8 + 2) < 0.6,
+                    rng.integers(1, 40, size=n // 8 + 2),
+                    rng.integers(40, 2_000, size=n // 8 + 2))
+    vals = np.arange(len(lens)) % 2
+    occupied = np.repeat(vals, lens)[:n]
+    if len(occupied) < n:
+        occupied = np.concatenate([occupied, np.zeros(n - len(occupied), dtype=occupied.dtype)])
+    df = pd.DataFrame({"ms": ms, "occupied": occupied.astype(int)})
+    df["sec"] = df["ms"] / 1000.0
+    return df
+
+def timed(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df.copy())["session_id"].to_numpy()
+    return time.perf_counter() - t0, out
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    for n in sizes:
+        df = synth_rows(n)
+        t_vec, ids_vec = timed(add_sessions, df)
+        line = f"n={n:>11,}  vectorized={t_vec:8.3f}s  sessions={int(ids_vec.max()) if n else 0}"
+        if n <= LOOP_MAX:
+            t_loop, ids_loop = timed(add_sessions_loop, df)
+            same = np.array_equal(ids_vec, ids_loop)
+            line += f"  loop={t_loop:8.2f}s  speedup={t_loop / max(t_vec, 1e-9):7.1f}x  identical={same}"
+            if not same:
+                print(line)
+                raise SystemExit("session_id mismatch between implementations")
+        else:
+            line += f"  loop=skipped (n > LOOP_MAX={LOOP_MAX:,})"
+        print(line)
+
+if __name__ == "__main__":
+    main()
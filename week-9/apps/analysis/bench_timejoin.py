@@ -0,0 +1,54 @@
+import sys, time, numpy as np, pandas as pd
+from timejoin import SensorIndex, HOT_HI
+
+# usage: python bench_timejoin.py [DAYS ...]   (default: 7, 30 and 90 days)
+DAYS = [7, 30, 90]
+EVENTS_PER_DAY = 400
+LOOP_EVENTS = 300   # the per-event mask loop is timed on this many events and scaled up
+SEED = 225
+
+def synth(days, seed=SEED):
+    """4 Hz sensor rows (occupied, heat index) for `days` days and a random event stream over them."""
+    rng = np.random.default_rng(seed)
+    n = days * 86400 * 4
+    t = np.datetime64("2025-06-01T00:00:00", "ns") + np.arange(n) * np.timedelta64(250, "ms")
+    occ = (np.sin(np.arange(n) / 4 / 3600 * np.pi / 2) > -0.3).astype(np.int8)
+    hi = (26.0 + 3.0 * np.sin(np.arange(n) / 4 / 86400 * 2 * np.pi) + rng.normal(0, 0.3, n)).astype(np.float32)
+    sensor = pd.DataFrame({"iso_ts": t, "occupied": occ, "heat_index_c": hi})
+    m = days * EVENTS_PER_DAY
+    ev = pd.DataFrame({"iso_ts": np.sort(t[0] + rng.integers(0, n * 250, m) * np.timedelta64(1, "ms"))})
+    return sensor, ev
+
+def loop_during(sensor, ev):
+    """Per event: mask the whole frame for the last row at or before it (the pattern timejoin replaces)."""
+    out = []
+    for ts in ev["iso_ts"]:
+        prior = sensor[sensor["iso_ts"] <= ts]
+        row = prior.iloc[-1] if len(prior) else None
+        ok = row is not None and (ts - row["iso_ts"]).total_seconds() <= 2.0
+        out.append(bool(ok and row["occupied"] == 1 and row["heat_index_c"] >= HOT_HI))
+    return np.array(out)
+
+def main():
+    days = [int(a) for a in sys.argv[1:]] or DAYS
+    for d in days:
+        sensor, ev = synth(d)
+        t0 = time.perf_counter()
+        idx = SensorIndex(sensor, columns=["occupied", "heat_index_c"])
+        t_build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        cond = (idx.col("occupied") == 1) & (idx.col("heat_index_c") >= HOT_HI)
+        hot = idx.during(ev["iso_ts"], cond)
+        t_query = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ref = loop_during(sensor, ev.iloc[:LOOP_EVENTS])
+        t_loop = (time.perf_counter() - t0) * len(ev) / LOOP_EVENTS
+        ok = np.array_equal(hot[:LOOP_EVENTS], ref)
+        print(f"days={d:>3}  rows={len(sensor):>11,}  events={len(ev):>7,}  index={t_build:6.3f}s"
+              f"  occupied&hot query={t_query:6.3f}s ({int(hot.sum()):,} hits)"
+              f"  mask loop~{t_loop:8.1f}s (est.)  identical={ok}")
+        if not ok:
+            raise SystemExit("during() disagrees with the per-event mask loop")
+
+if __name__ == "__main__":
+    main()
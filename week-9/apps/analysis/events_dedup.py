@@ -0,0 +1,59 @@
+import numpy as np, pandas as pd
+
+# Soft de-dup of phone events, shared by events_normalise.py (batch clean-up)
+# and live_plot.py (streaming, a few new rows per frame).
+
+WINDOW_S = 10
+
+def dedup_mask(df, keys, t="t", window_s=None, last=None):
+    """
+    Keep-mask for time-sorted events: a row is dropped when it has the same
+    `keys` as the row right before it (kept or not) and comes less than
+    `window_s` seconds after it, like the original row-by-row loops. `last`
+    is (key tuple, timestamp) of the row preceding `df`, for streaming; the
+    first row is always kept without it. NaN keys / NaT times never match.
+    window_s=None means the module's WINDOW_S at call time, so overriding it
+    (pipeline.py --set WINDOW_S=...) reaches every caller.
+    """
+    window_s = WINDOW_S if window_s is None else window_s
+    n = len(df)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    same = np.ones(n, dtype=bool)
+    for j, k in enumerate(keys):
+        col = df[k]
+        eq = (col == col.shift(1)).to_numpy(copy=True)
+        eq[0] = last is not None and bool(col.iloc[0] == last[0][j])
+        same &= eq
+    ts = pd.to_datetime(df[t])
+    gap = ts.diff().dt.total_seconds().to_numpy(copy=True)
+    gap[0] = (ts.iloc[0] - last[1]).total_seconds() if last is not None else np.nan
+    with np.errstate(invalid="ignore"):
+        close = gap < window_s
+    return ~(same & close)
+
+def dedup_events(df, keys, t="t", window_s=None):
+    """`df` without the rows dedup_mask() drops (df must already be sorted by `t`)."""
+    return df[dedup_mask(df, keys, t, window_s)]
+
+class EventDeduper:
+    """
+    Streaming dedup_events(): feed time-ordered chunks to filter(); the last
+    row's keys and time carry over, so chunked output equals one batch call.
+    """
+    def __init__(self, keys, t="t", window_s=None):
+        self.keys = list(keys)
+        self.t = t
+        self.window_s = window_s
+        self.last = None
+
+    def reset(self):
+        self.last = None
+
+    def filter(self, df):
+        if df.empty:
+            return df
+        keep = dedup_mask(df, self.keys, self.t, self.window_s, self.last)
+        tail = df.iloc[-1]
+        self.last = (tuple(tail[k] for k in self.keys), pd.Timestamp(tail[self.t]))
+        return df[keep]
@@ -1,34 +1,183 @@
-import pandas as pd
+import sys, numpy as np, pandas as pd
 from pathlib import Path
+from store import read_log
+from timejoin import SensorIndex, to_ns, TOLERANCE_S
+
+# Phone usage metrics from events_clean.csv: headline totals, a rates table
+# with one row per non-empty hour, per day and per work session, and the sensor
+# context of every event (sessions and sensor rows from the sessionizer's
+# <day>.sessions.csv files).
+#
+#   python events_metrics.py                          # every data/????-??-??.sessions.csv
+#   python events_metrics.py data/2025-09-25.sessions.csv
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
-DATA_DIR = PROJECT_ROOT / "data"    
+DATA_DIR = PROJECT_ROOT / "data"
 EV = DATA_DIR / "events_clean.csv"
+RATES = DATA_DIR / "events_rates.csv"
+CONTEXT = DATA_DIR / "events_context.csv"
+RATE_COLS = ["period", "start", "session", "hours", "unlocks", "app_opens",
+             "unlocks_per_h", "app_opens_per_h"]
+CONTEXT_COLS = ["iso_ts", "app", "opened_app", "session", "occupied", "heat_index_c", "hot",
+                "fidget", "fidget_ctx"]
+SENSOR_COLS = ["iso_ts", "session_id", "occupied", "heat_index_c", "fidget"]
+
+def load_events(path=EV):
+    """Cleaned events sorted by time, with an opened_app flag; rows without a time are dropped."""
+    df = pd.read_csv(path, parse_dates=["iso_ts"])
+    df = df[df["iso_ts"].notna()].sort_values("iso_ts", kind="stable").reset_index(drop=True)
+    app = df["app"].fillna("").astype(str).str.strip().str.lower()
+    df["opened_app"] = (~app.isin(["", "nan", "none"])).astype(int)
+    return df
+
+def session_spans(paths):
+    """
+    One row per work session: session ("<day>#<id>"), start and end time,
+    sorted by start. Session ids restart every day, hence the day prefix.
+    """
+    frames = []
+    for p in paths:
+        df = read_log(p, columns=["iso_ts", "session_id"])
+        df = df[df["session_id"] != 0]
+        if df.empty:
+            continue
+        g = df.groupby("session_id")["iso_ts"].agg(["min", "max"])
+        day = Path(p).name.split(".")[0]
+        frames.append(pd.DataFrame({"session": [f"{day}#{int(s)}" for s in g.index],
+                                    "start": g["min"].to_numpy(), "end": g["max"].to_numpy()}))
+    if not frames:
+        return pd.DataFrame({"session": pd.Series(dtype=object), "start": pd.Series(dtype="datetime64[ns]"),
+                             "end": pd.Series(dtype="datetime64[ns]")})
+    return pd.concat(frames, ignore_index=True).sort_values("start", ignore_index=True)
+
+def assign_sessions(ev, spans):
+    """
+    Session label of every event ("" outside sessions): one sorted merge_asof
+    to the last session that started at or before the event, kept only if the
+    event is not past that session's end.
+    """
+    if ev.empty or spans.empty:
+        return pd.Series("", index=ev.index, dtype=object)
+    ns = "datetime64[ns]"   # merge_asof wants identical time units on both sides
+    left = pd.DataFrame({"iso_ts": ev["iso_ts"].astype(ns)})
+    right = spans.astype({"start": ns, "end": ns})
+    m = pd.merge_asof(left, right, left_on="iso_ts", right_on="start", direction="backward")
+    inside = m["end"].notna() & (m["iso_ts"] <= m["end"])
+    return pd.Series(np.where(inside, m["session"], ""), index=ev.index, dtype=object)
+
+def _with_rates(df):
+    hours = df["hours"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["unlocks_per_h"] = np.where(hours > 0, df["unlocks"] / hours, np.nan).round(3)
+        df["app_opens_per_h"] = np.where(hours > 0, df["app_opens"] / hours, np.nan).round(3)
+    return df
+
+def rates(ev, spans=None):
+    """
+    Long table of unlock and app-open counts and per-hour rates (RATE_COLS)
+    for every hour and day with events and for every session in `spans`.
+    The events are grouped once, by (hour, session); days and sessions are
+    sums over that small table, so months of events cost one groupby.
+    """
+    spans = spans if spans is not None else session_spans([])
+    if ev.empty:
+        return pd.DataFrame(columns=RATE_COLS)
+    counts = pd.DataFrame({"hour": ev["iso_ts"].dt.floor("h"), "session": assign_sessions(ev, spans),
+                           "unlocks": 1, "app_opens": ev["opened_app"].to_numpy()})
+    g = counts.groupby(["hour", "session"], sort=True)[["unlocks", "app_opens"]].sum()
+
+    hourly = g.groupby(level="hour").sum()
+    hourly = hourly.assign(period="hour", start=hourly.index, session="", hours=1.0)
+    daily = hourly.groupby(hourly.index.floor("D"))[["unlocks", "app_opens"]].sum()
+    daily = daily.assign(period="day", start=daily.index, session="", hours=24.0)
+
+    per_sess = g.groupby(level="session").sum().drop(index="", errors="ignore")
+    sess = spans.set_index("session").join(per_sess, how="left").fillna({"unlocks": 0, "app_opens": 0})
+    sess = sess.assign(period="session", session=sess.index,
+                       hours=(sess["end"] - sess["start"]).dt.total_seconds() / 3600.0)
+
+    out = pd.concat([hourly, daily, sess], ignore_index=True)
+    out[["unlocks", "app_opens"]] = out[["unlocks", "app_opens"]].astype(np.int64)
+    return _with_rates(out)[RATE_COLS]
 
-def main():
-    df = pd.read_csv(EV, parse_dates=["iso_ts"])
+def event_context(ev, session_paths):
+    """
+    CONTEXT_COLS per event: the session label as in rates() and the occupied,
+    heat index, hot and fidget state of the sensor row in force, plus the
+    fidget around it (SensorIndex.attach). One index per sessions file, so
+    only a day of sensor rows is held at a time; events no file covers keep
+    session "" and NaN state.
+    """
+    out = ev.assign(session="", occupied=0, heat_index_c=np.nan, hot=0, fidget=np.nan, fidget_ctx=np.nan)
+    t_ns = to_ns(ev["iso_ts"])
+    for p in session_paths:
+        idx = SensorIndex(read_log(p, columns=SENSOR_COLS), columns=SENSOR_COLS[1:])
+        if not len(idx):
+            continue
+        # ev is time-sorted (load_events): the day's events are one slice
+        lo, hi = np.searchsorted(t_ns, [idx.t[0], idx.t[-1] + int(TOLERANCE_S * 1e9)], side="left")
+        if lo == hi:
+            continue
+        ctx = idx.attach(ev.iloc[lo:hi][["iso_ts"]])
+        day = Path(p).name.split(".")[0]
+        sid = ctx["session_id"].to_numpy()
+        ctx["session"] = [f"{day}#{int(s)}" if s else "" for s in sid]
+        rows = out.index[lo:hi]
+        for c in CONTEXT_COLS[3:]:
+            out.loc[rows, c] = ctx[c].to_numpy()
+    out = out[CONTEXT_COLS]
+    return out.round({"heat_index_c": 2, "fidget": 4, "fidget_ctx": 5})   # float32 sensor values
+
+def summarize(path=EV):
+    """Headline usage numbers of a cleaned events CSV as a dict (None when empty)."""
+    df = load_events(path)
     if df.empty:
-        print("No events.")
-        return
+        return None
 
-    df = df.sort_values("iso_ts").reset_index(drop=True)
-    df["opened_app"] = (df["app"].fillna("") != "").astype(int)
     total_unlocks = len(df)
-    app_unlocks = df["opened_app"].sum()
+    app_unlocks = int(df["opened_app"].sum())
 
     # rough duration and per-hour rates
     dur_hours = max((df["iso_ts"].iloc[-1] - df["iso_ts"].iloc[0]).total_seconds()/3600.0, 1e-9)
-    rate_unlocks = total_unlocks / dur_hours
-    rate_app_unlocks = app_unlocks / dur_hours
 
-    per_app = df[df["app"].ne("")]["app"].value_counts().to_dict()
+    per_app = df.loc[df["opened_app"] == 1, "app"].value_counts().to_dict()
+    return {"total_unlocks": total_unlocks, "app_unlocks": app_unlocks, "dur_hours": dur_hours,
+            "rate_unlocks": total_unlocks / dur_hours, "rate_app_unlocks": app_unlocks / dur_hours,
+            "per_app": per_app}
+
+def write_rates(session_paths, path=EV, out=RATES):
+    """rates() of the events in `path` against the given sessions CSVs, written to `out`."""
+    table = rates(load_events(path), session_spans(session_paths))
+    table.to_csv(out, index=False, date_format="%Y-%m-%dT%H:%M:%S")
+    return table
+
+def write_context(session_paths, path=EV, out=CONTEXT):
+    """event_context() of the events in `path`, written to `out`."""
+    table = event_context(load_events(path), session_paths)
+    table.to_csv(out, index=False, date_format="%Y-%m-%dT%H:%M:%S")
+    return table
+
+def main(argv=()):
+    m = summarize()
+    if m is None:
+        print("No events.")
+        return
+
+    print(f"Total unlocks: {m['total_unlocks']}")
+    print(f"Unlocks leading to app (instagram/tiktok/reddit): {m['app_unlocks']}")
+    print(f"Duration (h): {m['dur_hours']:.2f}")
+    print(f"Unlocks per hour: {m['rate_unlocks']:.2f}")
+    print(f"App-unlocks per hour: {m['rate_app_unlocks']:.2f}")
+    print(f"By app: {m['per_app']}")
 
-    print(f"Total unlocks: {total_unlocks}")
-    print(f"Unlocks leading to app (instagram/tiktok/reddit): {app_unlocks}")
-    print(f"Duration (h): {dur_hours:.2f}")
-    print(f"Unlocks per hour: {rate_unlocks:.2f}")
-    print(f"App-unlocks per hour: {rate_app_unlocks:.2f}")
-    print(f"By app: {per_app}")
+    paths = list(argv) or sorted(DATA_DIR.glob("????-??-??.sessions.csv"))
+    table = write_rates(paths)
+    n = table["period"].value_counts()
+    print(f"\nWrote {RATES}: {n.get('hour', 0)} hours, {n.get('day', 0)} days,"
+          f" {n.get('session', 0)} sessions ({len(paths)} sessions file(s))")
+    ctx = write_context(paths)
+    print(f"Wrote {CONTEXT}: {int((ctx['session'] != '').sum())} of {len(ctx)} events in a session,"
+          f" {int(ctx['hot'].sum())} while hot")
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -1,31 +1,85 @@
-import pandas as pd, json
+import pandas as pd, numpy as np, json, ast
 from pathlib import Path
+from events_dedup import dedup_events
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 DATA_DIR = PROJECT_ROOT / "data"
 INP = DATA_DIR / "events.csv"
 OUT = DATA_DIR / "events_clean.csv"
+FIELDS = ["source","type","app","note"]
+MAX_BLOB = 8192   # chars; longer cells are not event blobs and are not parsed
+
+try:
+    import orjson  # optional, faster blob parsing
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 def maybe_parse_json(s):
+    """
+    Dict from a JSON blob, or {}. Single-quoted pseudo-JSON ({'app': 'x'}) goes
+    through ast.literal_eval, so apostrophes inside values survive; the old
+    quote swap is only the last resort. Lists and other non-dicts give {}.
+    Blobs come from the network: anything over MAX_BLOB chars is skipped, and
+    literal_eval only sees cells that start like such a dict ("{'").
+    """
     if not isinstance(s, str): return {}
     s = s.strip()
-    if not s or s[0] not in "{[\"'": return {}
-    try:
-        return json.loads(s.replace("'", '"'))
-    except Exception:
-        return {}
+    if not s or s[0] not in "{[\"'" or len(s) > MAX_BLOB: return {}
+    parsers = [json_loads]
+    if s.startswith("{'"):
+        parsers.append(ast.literal_eval)
+    parsers.append(lambda x: json.loads(x.replace("'", '"')))
+    for parse in parsers:
+        try:
+            d = parse(s)
+        except Exception:
+            continue
+        if isinstance(d, str) and d != s:
+            return maybe_parse_json(d)   # double-encoded: "{\"app\": ...}"
+        return d if isinstance(d, dict) else {}
+    return {}
+
+def rescue_blobs(df):
+    """
+    Rows where a whole JSON blob ended up in one of FIELDS: fill that row's
+    empty FIELDS from the blob (missing keys -> ""). The first column holding
+    a "{" wins, as with the old column-by-column fillna. Each distinct blob is
+    parsed once into a small table that is expanded to the blob rows with
+    one take().
+    """
+    cols = [c for c in FIELDS if c in df.columns]
+    if not cols:
+        return df
+    has = np.column_stack([
+        (df[c].str if df[c].dtype == object else df[c].astype(str).str)
+        .contains("{", regex=False, na=False).to_numpy(dtype=bool) for c in cols])
+    rows = np.flatnonzero(has.any(axis=1))
+    if len(rows) == 0:
+        return df
+    first = has[rows].argmax(axis=1)
+    cells = np.empty(len(rows), dtype=object)
+    for j, c in enumerate(cols):
+        sel = first == j
+        cells[sel] = df[c].take(rows[sel]).to_numpy(dtype=object)
+    codes, uniq = pd.factorize(cells)
+    table = pd.DataFrame.from_records(
+        [{k: d.get(k, "") for k in FIELDS} for d in map(maybe_parse_json, uniq)], columns=FIELDS)
+    idx = df.index[rows]
+    rescued = table.take(codes).set_axis(idx)
+    for k in FIELDS:
+        if k not in df.columns:
+            df[k] = np.nan
+        elif not df[k].iloc[rows].isna().any():
+            continue
+        df[k] = df[k].fillna(rescued[k])   # aligned on the index: only blob rows can change
+    return df
 
 def main():
     df = pd.read_csv(INP)
 
     # rescue rows where a whole JSON blob ended up in a column
-    for col in ["source","type","app","note"]:
-        if col in df.columns:
-            mask = df[col].astype(str).str.contains("{", na=False)
-            if mask.any():
-                parsed = df.loc[mask, col].apply(maybe_parse_json)
-                for k in ["source","type","app","note"]:
-                    df.loc[mask, k] = df.loc[mask, k].fillna(parsed.apply(lambda d: d.get(k, "")))
+    df = rescue_blobs(df)
 
     # tidy
     for c in ["source","type","app","note"]:
@@ -42,13 +96,7 @@ def main():
     df["t"] = pd.to_datetime(df["iso_ts"], errors="coerce")
     df = df.sort_values("t").reset_index(drop=True)
 
-    keep = [True]
-    for i in range(1, len(df)):
-        same = (df.loc[i,"type"] == df.loc[i-1,"type"]) and (df.loc[i,"app"] == df.loc[i-1,"app"])
-        gap = (df.loc[i,"t"] - df.loc[i-1,"t"]).total_seconds()
-        keep.append(not (same and gap < 10))
-
-    df = df[pd.Series(keep).values].drop(columns=["t"])
+    df = dedup_events(df, ["type", "app"]).drop(columns=["t"])
     df.to_csv(OUT, index=False)
     print(f"Wrote {OUT} rows: {len(df)}")
 
@@ -0,0 +1,186 @@
+import json, math, sys
+from collections import deque
+
+from rules import START_HOLD_S, END_GAP_S, RULES   # dependency-free: the logger imports this
+
+# Streaming counterpart of anomalies.py: logger.py feeds each parsed row and the
+# S1/F1 rules fire on the row where the threshold is crossed. Memory is bounded
+# by the longest rule window, whatever the session length.
+
+class SessionTracker:
+    """Row-at-a-time START_HOLD_S / END_GAP_S hysteresis (same as sessionizer.py)."""
+    def __init__(self):
+        self.session_id = 0
+        self.in_session = False
+        self.hold = 0.0
+        self.gap = 0.0
+        self.last_sec = None
+
+    def step(self, sec, occupied):
+        dt = 0.0 if self.last_sec is None else max(0.0, sec - self.last_sec)
+        self.last_sec = sec
+        if not self.in_session:
+            if occupied == 1:
+                self.hold += dt
+                if self.hold >= START_HOLD_S:
+                    self.in_session = True
+                    self.session_id += 1
+            else:
+                self.hold = 0.0
+        else:
+            if occupied == 0:
+                self.gap += dt
+                if self.gap >= END_GAP_S:
+                    self.in_session = False
+                    self.hold = 0.0
+                    self.gap = 0.0
+            else:
+                self.gap = 0.0
+        return self.session_id if self.in_session else 0
+
+class WindowMean:
+    """Mean over the time window (t - window_s, t] with an O(1) amortised running sum."""
+    def __init__(self, window_s):
+        self.window_s = window_s
+        self.buf = deque()
+        self.total = 0.0
+
+    def add(self, t, x):
+        if not math.isnan(x):
+            self.buf.append((t, x))
+            self.total += x
+        while self.buf and self.buf[0][0] <= t - self.window_s:
+            self.total -= self.buf.popleft()[1]
+        if not self.buf:
+            self.total = 0.0   # drop any accumulated rounding
+        return self.total / len(self.buf) if self.buf else math.nan
+
+class P2Median:
+    """Streaming quantile estimate in O(1) memory (P-square, Jain & Chlamtac 1985)."""
+    def __init__(self, p=0.5):
+        self.p = p
+        self.q = []                                  # marker heights
+        self.n = [0, 1, 2, 3, 4]                     # marker positions
+        self.want = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.step = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x):
+        if math.isnan(x):
+            return
+        q, n = self.q, self.n
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.want[i] += self.step[i]
+        for i in (1, 2, 3):
+            d = self.want[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self):
+        q = self.q
+        if not q:
+            return math.nan
+        if len(q) < 5:
+            m = len(q) // 2
+            return q[m] if len(q) % 2 else (q[m - 1] + q[m]) / 2
+        return q[2]
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+class OnlineDetector:
+    """
+    Feed logger rows (dicts with ms/occupied/<rule columns>/iso_ts) one at a time.
+    Each rule fires at most once per session, on the first row where its window
+    is fully covered and the windowed mean reaches the threshold. Median-relative
+    rules use the running (P-square) median of the session so far, not the
+    whole-session median anomalies.py uses after the fact. Events are appended as
+    JSON lines to `path` (if set) and returned from feed().
+    """
+    def __init__(self, path=None, rules=RULES):
+        self.path = path
+        self.rules = rules
+        self.sessions = SessionTracker()
+        self._reset_session(0, None)
+
+    def _reset_session(self, sid, t0):
+        self.sid, self.t0 = sid, t0
+        self.windows = [WindowMean(r["window_s"]) for r in self.rules]
+        self.medians = [P2Median() if "median_margin" in r else None for r in self.rules]
+        self.fired = [False] * len(self.rules)
+
+    def feed(self, row):
+        sec = _num(row.get("ms")) / 1000.0
+        if math.isnan(sec):
+            return []
+        if self.sessions.last_sec is not None and sec < self.sessions.last_sec:
+            # device clock went backwards (board reset): restart the windows
+            self.t0 = sec
+            self.windows = [WindowMean(r["window_s"]) for r in self.rules]
+        sid = self.sessions.step(sec, _num(row.get("occupied")))
+        if sid == 0:
+            return []
+        if sid != self.sid:
+            self._reset_session(sid, sec)
+
+        events = []
+        elapsed = sec - self.t0
+        for i, rule in enumerate(self.rules):
+            x = _num(row.get(rule["col"]))
+            mean = self.windows[i].add(sec, x)
+            med = self.medians[i]
+            if med is not None:
+                med.add(x)
+                thr = med.value() + rule["median_margin"]
+            else:
+                thr = rule["threshold"]
+            if self.fired[i] or elapsed < rule["window_s"] or not mean >= thr:
+                continue
+            self.fired[i] = True
+            e = {"type": rule["type"], "session_id": sid, "iso_ts": row.get("iso_ts"),
+                 rule["out"]: round(mean, rule["digits"])}
+            if med is not None:
+                e["threshold"] = round(thr, rule["digits"])
+                e["session_median"] = round(med.value(), rule["digits"])
+            events.append(e)
+        if events and self.path:
+            with open(self.path, "a") as f:
+                for e in events:
+                    f.write(json.dumps(e) + "\n")
+        return events
+
+if __name__ == "__main__":
+    # replay a logged day through the detector, e.g.
+    #   python online_anomalies.py week-9/data/2025-09-25.csv
+    import csv
+    if len(sys.argv) < 2:
+        print("Usage: python online_anomalies.py week-9/data/2025-09-25.csv")
+        sys.exit(1)
+    det = OnlineDetector()
+    with open(sys.argv[1], newline="") as f:
+        for row in csv.DictReader(f):
+            for e in det.feed(row):
+                print(e)
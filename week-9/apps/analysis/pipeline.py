@@ -0,0 +1,197 @@
+import argparse, ast, hashlib, json, os, shutil, time
+from pathlib import Path
+import events_dedup, events_normalise, events_metrics, sessionizer, anomalies, rules, sim_results, plot_utils, store, timejoin
+
+# Make-like runner for the analysis chain
+#
+#   sessionizer -> anomalies          (per daily log)
+#   events_normalise + sessions -> events_metrics
+#   sim_results                       (baseline vs intervention)
+#
+# A stage's cache key is a content hash of its input files, its code and the
+# parameters it depends on. Outputs are stored by content hash under
+# data/cache/pipeline/, so a stage is skipped when its outputs are already
+# there, restored when the key was seen before (e.g. a threshold set back) and
+# only run otherwise. Downstream stages rerun only if an upstream output
+# actually changed.
+#
+#   python pipeline.py                          # bring everything up to date
+#   python pipeline.py -n                       # just show what would happen
+#   python pipeline.py --set HI_THRESHOLD=29    # override a parameter for this run
+#   python pipeline.py --force anomalies        # rerun stages whose name starts with this
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DATA_DIR = PROJECT_ROOT / "data"
+CACHE_DIR = DATA_DIR / "cache" / "pipeline"
+EVENTS_METRICS = DATA_DIR / "events_metrics.json"
+
+# modules whose UPPERCASE constants --set may override
+PARAM_MODULES = [events_dedup, rules, sessionizer, anomalies, sim_results]
+
+_digests = {}   # (path, size, mtime_ns) -> digest: each file is hashed once per run
+
+def file_digest(path):
+    st = os.stat(path)
+    memo = (str(path), st.st_size, st.st_mtime_ns)
+    if memo not in _digests:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            while chunk := f.read(1 << 20):
+                h.update(chunk)
+        _digests[memo] = h.hexdigest()
+    return _digests[memo]
+
+def _rel(path):
+    return Path(path).resolve().relative_to(PROJECT_ROOT).as_posix()
+
+def _events_metrics(session_csvs):
+    with open(EVENTS_METRICS, "w") as f:
+        json.dump(events_metrics.summarize(), f, indent=2)
+    events_metrics.write_rates(session_csvs)
+    events_metrics.write_context(session_csvs)
+    print("Wrote:", EVENTS_METRICS, events_metrics.RATES, events_metrics.CONTEXT)
+
+def _anomalies(sessions_csv, out):
+    rules = anomalies.make_rules()
+    events = list(anomalies.find_anomalies_chunks(anomalies.iter_sessions_csv(sessions_csv, rules=rules), rules))
+    with open(out, "w") as f:
+        json.dump(events, f, indent=2)
+    print(f"Wrote: {out} ({len(events)} anomalies)")
+
+def _sessionize(log):
+    sessionizer.save_with_sessions_chunked(str(log))
+
+def stages(data_dir=DATA_DIR):
+    """
+    The chain in dependency order. Each stage is a dict: `run` writes the
+    `outputs`; `inputs` and the source of the `code` modules are hashed into
+    the key along with `params()`, the constants the result depends on.
+    """
+    out, session_csvs = [], []
+    for log in sorted(Path(data_dir).glob("????-??-??.csv")):
+        sess = log.with_name(log.stem + ".sessions.csv")
+        anom = log.with_name(log.stem + ".anomalies.json")
+        session_csvs.append(sess)
+        out += [
+            {"name": f"sessionizer:{log.stem}", "run": lambda log=log: _sessionize(log),
+             "inputs": [log], "outputs": [sess], "code": [sessionizer, rules, store],
+             "params": lambda: {"START_HOLD_S": sessionizer.START_HOLD_S, "END_GAP_S": sessionizer.END_GAP_S}},
+            {"name": f"anomalies:{log.stem}", "run": lambda sess=sess, anom=anom: _anomalies(sess, anom),
+             "inputs": [sess], "outputs": [anom], "code": [anomalies, rules, store],
+             "params": lambda: {"rules": anomalies.make_rules()}},
+        ]
+    out += [
+        {"name": "events_normalise", "run": events_normalise.main,
+         "inputs": [events_normalise.INP], "outputs": [events_normalise.OUT],
+         "code": [events_normalise, events_dedup],
+         "params": lambda: {"WINDOW_S": events_dedup.WINDOW_S}},
+        {"name": "events_metrics", "run": lambda: _events_metrics(session_csvs),
+         "inputs": [events_metrics.EV] + session_csvs, "outputs": [EVENTS_METRICS, events_metrics.RATES, events_metrics.CONTEXT],
+         "code": [events_metrics, timejoin, store], "params": lambda: {}},
+    ]
+    sims = sim_results.discover(data_dir)
+    out.append(
+        {"name": "sim_results", "run": lambda: sim_results.main(["--root", str(data_dir)]),
+         "inputs": [Path(data_dir) / k / f"{n}{suffix}.csv" for k, n in sims for suffix in ("", "_events")],
+         "outputs": [sim_results.OUTIMG / f"validation_{p}_synth.png"
+                     for p in ("bars", "timeline_baseline", "timeline_intervention")],
+         "code": [sim_results, plot_utils, timejoin, store],
+         "params": lambda: {k: getattr(sim_results, k) for k in
+                            ("COMFORT_LOW", "COMFORT_HIGH", "METRICS_VERSION", "BOOT", "CI", "SEED")}})
+    return out
+
+def stage_key(st):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(st["name"].encode())
+    for m in st["code"]:
+        h.update(f"{Path(m.__file__).name}={file_digest(m.__file__)}".encode())
+    for p in st["inputs"]:
+        h.update(f"{_rel(p)}={file_digest(p)}".encode())
+    h.update(json.dumps(st["params"](), sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+def _put_blob(path):
+    digest = file_digest(path)
+    blob = CACHE_DIR / "blobs" / digest
+    if not blob.exists():
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_suffix(".tmp")
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, blob)
+    return digest
+
+def _restore(rel, digest):
+    dest = PROJECT_ROOT / rel
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    shutil.copyfile(CACHE_DIR / "blobs" / digest, tmp)
+    os.replace(tmp, dest)
+
+def run(stages, force=(), dry=False):
+    """
+    Bring every stage up to date, in order; returns {name: status}. With
+    dry=True nothing is run or restored, and stages fed by one that would
+    change its outputs are reported as waiting on it.
+    """
+    status, pending = {}, set()
+    for st in stages:
+        name = st["name"]
+        t0 = time.perf_counter()
+        if dry and pending.intersection(_rel(p) for p in st["inputs"]):
+            status[name] = "waits on upstream"
+            pending.update(_rel(p) for p in st["outputs"])
+            print(f"[pipeline] {name:<26} {status[name]}")
+            continue
+        missing = [p for p in st["inputs"] if not Path(p).exists()]
+        if missing:
+            raise SystemExit(f"[pipeline] {name}: missing input {missing[0]}")
+        key = stage_key(st)
+        entry = CACHE_DIR / "stages" / f"{key}.json"
+        if entry.exists() and not any(name.startswith(f) for f in force):
+            outputs = json.loads(entry.read_text())["outputs"]
+            stale = {rel: d for rel, d in outputs.items()
+                     if not (PROJECT_ROOT / rel).exists() or file_digest(PROJECT_ROOT / rel) != d}
+            if not stale:
+                status[name] = "up to date"
+            elif dry:
+                status[name] = f"would restore {len(stale)} output(s)"
+                pending.update(stale)
+            else:
+                for rel, d in stale.items():
+                    _restore(rel, d)
+                status[name] = f"restored {len(stale)} output(s) from cache"
+        elif dry:
+            status[name] = "would run"
+            pending.update(_rel(p) for p in st["outputs"])
+        else:
+            st["run"]()
+            outputs = {_rel(p): _put_blob(p) for p in st["outputs"]}
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            entry.write_text(json.dumps({"stage": name, "params": st["params"](), "outputs": outputs,
+                                         "seconds": round(time.perf_counter() - t0, 3)},
+                                        indent=2, default=str))
+            status[name] = "ran"
+        print(f"[pipeline] {name:<26} {status[name]}  ({time.perf_counter() - t0:.2f}s)")
+    return status
+
+def set_param(assign):
+    """NAME=value (a Python literal) on every PARAM_MODULES module defining NAME."""
+    name, _, value = assign.partition("=")
+    hits = [m for m in PARAM_MODULES if name.isupper() and hasattr(m, name)]
+    if not hits or not value:
+        raise SystemExit(f"unknown parameter or missing value: {assign}")
+    for m in hits:
+        setattr(m, name, ast.literal_eval(value))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the analysis stages that are out of date.")
+    ap.add_argument("-n", "--dry-run", action="store_true")
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=VALUE")
+    ap.add_argument("--force", action="append", default=[], metavar="STAGE")
+    args = ap.parse_args(argv)
+    for a in args.set:
+        set_param(a)
+    run(stages(), args.force, args.dry_run)
+
+if __name__ == "__main__":
+    main()
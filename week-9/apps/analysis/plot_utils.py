@@ -0,0 +1,199 @@
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.collections import PolyCollection
+
+# Small matplotlib helpers shared by live_plot.py and sim_results.py.
+
+def _as_x(t):
+    """Plot x values: datetimes become matplotlib date numbers."""
+    a = np.asarray(t)
+    if np.issubdtype(a.dtype, np.datetime64) or a.dtype == object:
+        return mdates.date2num(a)
+    return a.astype(float)
+
+def occupied_intervals(t, occ, min_gap=0.0):
+    """
+    (x0, x1) arrays of the occupied==1 runs, found with np.diff edge detection.
+    A run spans from its first sample to the first 0 after it (or the last
+    sample), like the old per-sample loop did. Runs separated by less than
+    `min_gap` (e.g. one pixel in x units) are merged.
+    """
+    x = _as_x(t)
+    on = np.asarray(occ) == 1
+    if len(x) < 2 or not on.any():
+        return np.empty(0), np.empty(0)
+    edges = np.diff(np.concatenate(([0], on.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.minimum(np.flatnonzero(edges == -1), len(x) - 1)
+    x0, x1 = x[starts], x[ends]
+    if min_gap > 0 and len(x0) > 1:
+        new = np.concatenate(([True], x0[1:] - x1[:-1] >= min_gap))
+        x0, x1 = x0[new], x1[np.append(np.flatnonzero(new)[1:] - 1, len(x1) - 1)]
+    return x0, x1
+
+class IntervalShade:
+    """
+    All occupied intervals of an axes as one full-height PolyCollection (x in
+    data, y in axes coordinates). update() swaps the rectangles in place, so
+    redraws never add or remove artists.
+    """
+    def __init__(self, ax, color="lightblue", alpha=0.08, **kw):
+        self.coll = PolyCollection([], facecolors=color, edgecolors="none", alpha=alpha,
+                                   transform=ax.get_xaxis_transform(), **kw)
+        ax.add_collection(self.coll, autolim=False)
+
+    def update(self, t, occ, min_gap=0.0):
+        x0, x1 = occupied_intervals(t, occ, min_gap)
+        verts = np.empty((len(x0), 4, 2))
+        verts[:, 0, 0] = verts[:, 1, 0] = x0
+        verts[:, 2, 0] = verts[:, 3, 0] = x1
+        verts[:, [0, 3], 1] = 0.0
+        verts[:, [1, 2], 1] = 1.0
+        self.coll.set_verts(verts)
+        return self.coll
+
+class BlitManager:
+    """
+    Redraw only the artists that change. Registered artists are marked
+    animated (skipped by normal draws); after every full draw the clean figure
+    is cached, and update() restores it, draws the artists and blits. Pass
+    full=True when limits, ticks or legends change and the cache is stale.
+    """
+    def __init__(self, canvas, artists=()):
+        self.canvas = canvas
+        self.bg = None
+        self.artists = []
+        for a in artists:
+            self.add(a)
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def add(self, art):
+        art.set_animated(True)
+        self.artists.append(art)
+        return art
+
+    def _on_draw(self, event):
+        self.bg = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        fig = self.canvas.figure
+        for a in self.artists:
+            fig.draw_artist(a)
+
+    def update(self, full=False):
+        if full or self.bg is None:
+            self.canvas.draw_idle()   # _on_draw recaches and draws the artists
+            return
+        self.canvas.restore_region(self.bg)
+        self._draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+class MinMaxPyramid:
+    """
+    Append-only series with precomputed min/max summaries for fast zoomed-out
+    drawing. Level 0 is the raw samples; level k holds the min and max of each
+    block of FANOUT**k samples, extended incrementally as whole blocks fill.
+    Every level lives in arrays that double their capacity when full, so an
+    append costs only the new samples and blocks, not the history.
+    decimate() picks the coarsest level that still gives ~2 points per pixel
+    and reduces it to one (min, max) pair per pixel column, so drawing a whole
+    day costs about the same as drawing five minutes.
+    """
+    FANOUT = 8
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.n = 0
+        self.t = np.empty(1024)
+        self.y = {c: np.empty(1024) for c in self.columns}
+        self.levels = []   # [[n_blocks, t_start, {col: (mins, maxs)}]] for k = 1, 2, ...
+
+    def clear(self):
+        self.__init__(self.columns)
+
+    @staticmethod
+    def _grow(a, need):
+        if need <= len(a):
+            return a
+        b = np.empty(max(need, 2 * len(a)))
+        b[:len(a)] = a
+        return b
+
+    def extend(self, t, cols):
+        """Append samples (t ascending, as plot x values) and refresh the summaries."""
+        k = len(t)
+        if k == 0:
+            return
+        need = self.n + k
+        self.t = self._grow(self.t, need)
+        self.t[self.n:need] = t
+        for c in self.columns:
+            self.y[c] = self._grow(self.y[c], need)
+            self.y[c][self.n:need] = cols[c]
+        self.n = need
+        self._build()
+
+    def _build(self):
+        F = self.FANOUT
+        src_n, src_t = self.n, self.t
+        src = {c: (self.y[c], self.y[c]) for c in self.columns}
+        lvl = 0
+        while src_n >= F:
+            nb = src_n // F
+            if lvl == len(self.levels):
+                self.levels.append([0, np.empty(64), {c: (np.empty(64), np.empty(64)) for c in self.columns}])
+            level = self.levels[lvl]
+            done, lt, lc = level
+            if nb > done:
+                # only the blocks completed since last time, written in place
+                blk = slice(done * F, nb * F)
+                lt = self._grow(lt, nb)
+                lt[done:nb] = src_t[blk][::F]
+                for c in self.columns:
+                    lo, hi = src[c]
+                    mins, maxs = self._grow(lc[c][0], nb), self._grow(lc[c][1], nb)
+                    mins[done:nb] = np.fmin.reduce(lo[blk].reshape(-1, F), axis=1)
+                    maxs[done:nb] = np.fmax.reduce(hi[blk].reshape(-1, F), axis=1)
+                    lc[c] = (mins, maxs)
+                level[:] = [nb, lt, lc]
+            src_n, src_t, src = nb, lt, lc
+            lvl += 1
+
+    def decimate(self, col, t0, t1, pixels):
+        """(x, y) of `col` over [t0, t1] with at most ~2 points per pixel column."""
+        if self.n == 0:
+            return np.empty(0), np.empty(0)
+        pixels = max(int(pixels), 1)
+        t = self.t[:self.n]
+        i0 = max(np.searchsorted(t, t0, "left") - 1, 0)
+        i1 = min(np.searchsorted(t, t1, "right") + 1, self.n)
+        if i1 - i0 <= 2 * pixels:
+            return t[i0:i1], self.y[col][i0:i1]
+        # coarsest level with >= 2 blocks per pixel, plus raw samples past its last whole block
+        span = i1 - i0
+        k = 0
+        while k < len(self.levels) and span // self.FANOUT ** (k + 1) >= 2 * pixels:
+            k += 1
+        if k == 0:
+            xs, lo, hi = t[i0:i1], self.y[col][i0:i1], self.y[col][i0:i1]
+        else:
+            nb, lt, lc = self.levels[k - 1]
+            lt = lt[:nb]
+            j0 = max(np.searchsorted(lt, t0, "right") - 1, 0)
+            j1 = np.searchsorted(lt, t1, "right")
+            tail = slice(max(nb * self.FANOUT ** k, i0), i1)
+            xs = np.concatenate((lt[j0:j1], t[tail]))
+            lo = np.concatenate((lc[col][0][j0:j1], self.y[col][tail]))
+            hi = np.concatenate((lc[col][1][j0:j1], self.y[col][tail]))
+        # one (min, max) pair per pixel column
+        edges = np.linspace(xs[0], xs[-1], pixels + 1)
+        starts = np.unique(np.searchsorted(xs, edges[:-1], "left"))
+        starts = starts[starts < len(xs)]
+        mins = np.fmin.reduceat(lo, starts)
+        maxs = np.fmax.reduceat(hi, starts)
+        ends = np.append(starts[1:], len(xs)) - 1
+        x = np.column_stack((xs[starts], xs[ends])).ravel()
+        y = np.column_stack((mins, maxs)).ravel()
+        return x, y
@@ -0,0 +1,26 @@
+# Session and anomaly thresholds shared by the batch scripts (sessionizer.py,
+# anomalies.py) and the streaming detector the serial logger runs
+# (online_anomalies.py). Constants only, no imports: the logger starts without
+# pandas/numpy and keeps capturing whatever state the analysis scripts are in.
+
+START_HOLD_S = 10   # require 10s of occupied to start a session
+END_GAP_S    = 120  # end after 120s unoccupied
+
+HI_THRESHOLD = 28.0
+S1_WINDOW_S  = 600     # 10 min
+F1_WINDOW_S  = 300     # 5 min
+F1_MARGIN    = 0.005   # add-on over per-session median (tune)
+
+# rule table: one entry per anomaly type, evaluated together by find_anomalies.
+# A rule fires at the first row of a session where the `window_s` time-based
+# mean of `col` reaches `threshold`, or per-session median + `median_margin`.
+def make_rules():
+    """The rule table from the current thresholds (RULES is it at import time)."""
+    return [
+        {"type": "S1_too_warm", "col": "heat_index_c", "window_s": S1_WINDOW_S,
+         "threshold": HI_THRESHOLD, "out": "heat_index_c_10min", "digits": 2},
+        {"type": "F1_fidget_spike", "col": "fidget", "window_s": F1_WINDOW_S,
+         "median_margin": F1_MARGIN, "out": "fidget_5min", "digits": 4},
+    ]
+
+RULES = make_rules()
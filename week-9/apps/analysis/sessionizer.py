@@ -1,10 +1,10 @@
-import os, sys, pandas as pd
+import io, json, os, sys, numpy as np, pandas as pd
+from store import read_log, typed, iter_log, CHUNK_ROWS
+from rules import START_HOLD_S, END_GAP_S   # shared with the live logger
 
-START_HOLD_S = 10   # require 10s of occupied to start a session
-END_GAP_S    = 120  # end after 120s unoccupied
+ISO_FMT      = "%Y-%m-%dT%H:%M:%S"  # iso_ts as the logger writes it
 
-def load_csv(path):
-    df = pd.read_csv(path)
+def prepare(df):
     # ensure types
     for c in ["occupied","focused"]:
         if c in df.columns: df[c] = df[c].astype(int)
@@ -12,7 +12,129 @@ def load_csv(path):
     df["sec"] = df["ms"] / 1000.0
     return df
 
+def load_csv(path):
+    return prepare(read_log(path))
+
+def iter_csv(path, chunksize=CHUNK_ROWS):
+    """load_csv() as typed, prepared chunks (see store.iter_log)."""
+    for chunk in iter_log(path, chunksize=chunksize):
+        yield prepare(chunk)
+
+def new_state():
+    # hysteresis state carried between calls; hold only matters out of a
+    # session and gap only inside one, the other is kept at 0.0
+    return {"session_id": 0, "in_session": False, "hold": 0.0, "gap": 0.0, "last_sec": None}
+
+def _runs(mask):
+    """Start/end (inclusive) indices of consecutive True runs in a bool array."""
+    m = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.diff(m)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+def _run_sum(dt, start, end, carry):
+    # sequential running sum over one run, seeded like `hold += dt` would be
+    if carry:
+        return np.cumsum(np.concatenate(([carry], dt[start:end + 1])))[1:]
+    return np.cumsum(dt[start:end + 1])
+
+def _crossings(dt, starts, ends, limit, carry=0.0):
+    """
+    For every run, the first index where the running sum of dt (restarted at the
+    run start, or seeded with `carry` for a run starting at row 0) reaches
+    `limit`, or -1 if it never does. The run totals are only used to shortlist
+    candidates; the crossing itself comes from a per-run cumsum so the float
+    rounding matches the `hold += dt` / `gap += dt` loop exactly.
+    """
+    hit = np.full(len(starts), -1, dtype=np.int64)
+    if len(starts) == 0:
+        return hit
+    csum = np.cumsum(dt)
+    totals = csum[ends] - csum[starts] + dt[starts]
+    totals[starts == 0] += carry
+    # bound on the rounding error of the global cumsum, so no real hit is missed
+    slack = max(1e-6, float(csum[-1] + carry) * len(dt) * np.finfo(float).eps)
+    for r in np.flatnonzero(totals >= limit - slack):
+        acc = _run_sum(dt, starts[r], ends[r], carry if starts[r] == 0 else 0.0)
+        if acc[-1] >= limit:
+            hit[r] = starts[r] + int(np.searchsorted(acc, limit, side="left"))
+    return hit
+
+def label_sessions(sec, occ, state=None):
+    """
+    Same START_HOLD_S / END_GAP_S hysteresis as add_sessions_loop, but the state
+    machine steps over occupied/unoccupied runs instead of rows. Starts from
+    `state` (see new_state) and returns (session_ids, state after the last row),
+    so a file can be labelled in pieces with the same result as in one go.
+    """
+    st = dict(state or new_state())
+    sec = np.asarray(sec, dtype=float)
+    occ = np.asarray(occ)
+    n = len(sec)
+    sess_ids = np.zeros(n, dtype=np.int64)
+    if not n:
+        return sess_ids, st
+
+    prev = sec[0] if st["last_sec"] is None else st["last_sec"]
+    d = np.diff(sec, prepend=prev)
+    dt = np.where(d > 0, d, 0.0)   # max(0, dt) with NaN -> 0
+
+    s1, e1 = _runs(occ == 1)
+    s0, e0 = _runs(occ == 0)
+    start_at = _crossings(dt, s1, e1, START_HOLD_S, st["hold"])
+    end_at = _crossings(dt, s0, e0, END_GAP_S, st["gap"])
+    s1h, start_at = s1[start_at >= 0], start_at[start_at >= 0]
+    s0h, end_at = s0[end_at >= 0], end_at[end_at >= 0]
+
+    session_id = st["session_id"]
+    in_session = st["in_session"]
+    start = -1 if in_session else None
+    pos = 0
+    while True:
+        if not in_session:
+            # next occupied run (starting at/after pos) that holds long enough
+            k = np.searchsorted(s1h, pos, side="left")
+            if k == len(start_at):
+                break
+            start = start_at[k]
+            session_id += 1
+            in_session = True
+        # next unoccupied run after the start that gaps long enough
+        k = np.searchsorted(s0h, start + 1, side="left")
+        if k == len(end_at):
+            sess_ids[max(start, 0):] = session_id
+            break
+        end = end_at[k]
+        sess_ids[max(start, 0):end] = session_id   # the row that ends it reads 0
+        in_session = False
+        pos = end + 1
+
+    # carry the partial hold/gap of the trailing run into the next call
+    hold = gap = 0.0
+    if in_session and occ[-1] == 0:
+        gap = float(_run_sum(dt, s0[-1], e0[-1], st["gap"] if s0[-1] == 0 else 0.0)[-1])
+    elif not in_session and occ[-1] == 1:
+        hold = float(_run_sum(dt, s1[-1], e1[-1], st["hold"] if s1[-1] == 0 else 0.0)[-1])
+    st.update(session_id=int(session_id), in_session=bool(in_session),
+              hold=hold, gap=gap, last_sec=float(sec[-1]))
+    return sess_ids, st
+
 def add_sessions(df):
+    df["session_id"], _ = label_sessions(df["sec"].to_numpy(dtype=float), df["occupied"].to_numpy())
+    return df
+
+def add_sessions_chunks(chunks, state=None):
+    """
+    add_sessions() over an iterable of chunks: the hysteresis state is carried
+    from one chunk to the next, so the labels equal a single pass over the
+    whole file while only one chunk is in memory.
+    """
+    st = state or new_state()
+    for df in chunks:
+        df["session_id"], st = label_sessions(df["sec"].to_numpy(dtype=float), df["occupied"].to_numpy(), st)
+        yield df
+
+def add_sessions_loop(df):
+    # reference row-by-row state machine (kept for benchmarking / cross-checks)
     session_id = 0
     in_session = False
     start_t = None
@@ -51,14 +173,82 @@ def add_sessions(df):
 
 def save_with_sessions(path, df):
     out = path.replace(".csv", ".sessions.csv")
-    df.to_csv(out, index=False)
+    df.to_csv(out, index=False, date_format=ISO_FMT)
     print("Wrote:", out)
 
+def save_with_sessions_chunked(path, chunksize=CHUNK_ROWS):
+    """Label `path` chunk by chunk and stream the result to <day>.sessions.csv."""
+    out = path.replace(".csv", ".sessions.csv")
+    n = 0
+    with open(out, "w", newline="") as f:
+        for df in add_sessions_chunks(iter_csv(path, chunksize)):
+            df.to_csv(f, index=False, header=not n, date_format=ISO_FMT)
+            n += len(df)
+    print(f"Wrote: {out} ({n} rows)")
+
+def _save_checkpoint(path, ckpt):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(ckpt, f)
+    os.replace(tmp, path)
+
+def update_sessions(path):
+    """
+    Incremental mode: label only the bytes appended to `path` since the last call
+    and append them to <day>.sessions.csv. The hysteresis state, the byte offset
+    into the log and the size of the output are kept in <day>.sessions.ckpt.json.
+    Falls back to a full relabel if the log shrank or the checkpoint is missing.
+    """
+    out = path.replace(".csv", ".sessions.csv")
+    ckpt_path = path.replace(".csv", ".sessions.ckpt.json")
+    ckpt = None
+    if os.path.exists(ckpt_path) and os.path.exists(out):
+        with open(ckpt_path) as f:
+            ckpt = json.load(f)
+        if os.path.getsize(path) < ckpt["offset"] or os.path.getsize(out) < ckpt["out_size"]:
+            ckpt = None   # log rotated/truncated or output lost: start over
+    if ckpt is None:
+        ckpt = {"offset": 0, "out_size": 0, "columns": None, "state": new_state()}
+
+    with open(path, "rb") as f:
+        f.seek(ckpt["offset"])
+        data = f.read()
+    data = data[:data.rfind(b"\n") + 1]   # complete lines only; a partial one waits
+    if not data:
+        print("No new rows:", path)
+        return 0
+
+    if ckpt["columns"] is None:
+        df = pd.read_csv(io.BytesIO(data))
+        ckpt["columns"] = list(df.columns)
+    else:
+        df = pd.read_csv(io.BytesIO(data), header=None, names=ckpt["columns"])
+    df = prepare(typed(df))
+    df["session_id"], ckpt["state"] = label_sessions(
+        df["sec"].to_numpy(dtype=float), df["occupied"].to_numpy(), ckpt["state"])
+
+    # drop anything written after the last checkpoint (e.g. a crash mid-append)
+    with open(out, "r+" if ckpt["out_size"] else "w", newline="") as f:
+        f.truncate(ckpt["out_size"])
+        f.seek(ckpt["out_size"])
+        df.to_csv(f, index=False, header=not ckpt["out_size"], date_format=ISO_FMT)
+        ckpt["out_size"] = f.tell()
+    ckpt["offset"] += len(data)
+    _save_checkpoint(ckpt_path, ckpt)
+    print(f"Appended {len(df)} rows to: {out}")
+    return len(df)
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python sessionizer.py week-9/data/2025-09-25.csv")
+    args = [a for a in sys.argv[1:] if a not in ("--incremental", "--chunked")]
+    if not args:
+        print("Usage: python sessionizer.py [--incremental | --chunked] week-9/data/2025-09-25.csv")
         sys.exit(1)
-    p = sys.argv[1]
-    df = load_csv(p)
-    df = add_sessions(df)
-    save_with_sessions(p, df)
+    p = args[0]
+    if "--incremental" in sys.argv:
+        update_sessions(p)
+    elif "--chunked" in sys.argv:
+        save_with_sessions_chunked(p)
+    else:
+        df = load_csv(p)
+        df = add_sessions(df)
+        save_with_sessions(p, df)
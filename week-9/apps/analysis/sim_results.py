@@ -1,18 +1,36 @@
-import pandas as pd, numpy as np
+import argparse, hashlib, os, time, pandas as pd, numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from store import read_log
+from plot_utils import IntervalShade
+from timejoin import SensorIndex
+
+# Baseline vs intervention evaluation over every session found under
+# data/<kind>/ (any depth, so data/sim/ batches work too):
+#
+#   python sim_results.py                       # data/baseline + data/intervention
+#   python sim_results.py --root data/sim --boot 5000 --workers 8
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 DATA = PROJECT_ROOT / "data"
 OUTIMG = PROJECT_ROOT / "docs/img"
 OUTIMG.mkdir(parents=True, exist_ok=True)
+CACHE = DATA / "cache" / "sim_metrics.csv"
 
 COMFORT_LOW, COMFORT_HIGH = 24.0, 27.0
+KINDS = ["baseline", "intervention"]
+METRICS = ["comfort_min", "focus_min", "rate_app"]
+SENSOR_COLS = ["iso_ts", "ms", "occupied", "heat_index_c", "fidget"]   # all metrics/timeline read
+METRICS_VERSION = 2   # bump when metrics() changes so cached rows are recomputed
+BOOT = 2000
+CI = 0.95
+SEED = 225
 
-def load_pair(kind, name):
-    df = pd.read_csv(DATA / kind / f"{name}.csv", parse_dates=["iso_ts"])
-    ev = pd.read_csv(DATA / kind / f"{name}_events.csv", parse_dates=["iso_ts"])
+def load_pair(kind, name, root=DATA):
+    df = read_log(root / kind / f"{name}.csv", columns=SENSOR_COLS)
+    ev = read_log(root / kind / f"{name}_events.csv")
     return df, ev
 
 def metrics(df, ev):
@@ -31,30 +49,148 @@ def metrics(df, ev):
     thr = dfo["fidget"].median() + 0.002
     focus_mask = (dfo["fidget"] < thr)
     focus_min = float((focus_mask).sum() * dt / 60.0)
-    # distraction rate: unlocks with an app per occupied hour
-    ev_app = ev[ev["app"].fillna("")!=""].copy()
+    # distraction rate: unlocks with an app while occupied, per occupied hour
+    ev_app = ev[ev["app"].fillna("")!=""]
+    idx = SensorIndex(df, columns=["occupied"])
+    n_app = int(idx.during(ev_app["iso_ts"], idx.col("occupied") == 1).sum())
     # compute occupied duration (hours)
     occ_hours = (dfo.shape[0] * dt) / 3600.0
-    rate_app_per_hour = (len(ev_app) / occ_hours) if occ_hours>0 else 0.0
+    rate_app_per_hour = (n_app / occ_hours) if occ_hours>0 else 0.0
     return dict(comfort_min=comfort_min, focus_min=focus_min, rate_app=rate_app_per_hour,
                 focus_thr=thr)
 
-def bar_plot(res_baseline, res_intervention, outpath):
+def discover(root=DATA, kinds=KINDS):
+    """[(kind, name)] of every sensor CSV with an _events.csv twin under root/<kind>/, sorted."""
+    found = []
+    for kind in kinds:
+        base = Path(root) / kind
+        for p in sorted(base.rglob("*_events.csv")):
+            sensor = p.with_name(p.name[:-len("_events.csv")] + ".csv")
+            if sensor.exists():
+                found.append((kind, sensor.relative_to(base).with_suffix("").as_posix()))
+    return found
+
+def file_hash(*paths):
+    """Content hash of the given files plus METRICS_VERSION and the comfort band, the metrics cache key."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"v{METRICS_VERSION} {COMFORT_LOW} {COMFORT_HIGH}".encode())
+    for p in paths:
+        with open(p, "rb") as f:
+            while chunk := f.read(1 << 20):
+                h.update(chunk)
+    return h.hexdigest()
+
+def _set_comfort(low, high):
+    # pool initializer: workers started with "spawn" would see the defaults
+    global COMFORT_LOW, COMFORT_HIGH
+    COMFORT_LOW, COMFORT_HIGH = low, high
+
+def session_metrics(job):
+    """Worker: (kind, name, root) -> metrics dict of that session."""
+    kind, name, root = job
+    return metrics(*load_pair(kind, name, root))
+
+def evaluate(sessions, root=DATA, workers=None, frames=None, cache=CACHE):
+    """
+    One row of metrics per (kind, name) session. Sessions whose CSVs hash to
+    a cached key are not read at all; the rest are computed on a process pool
+    and added to the cache. `frames` maps (kind, name) to already loaded
+    (df, ev) pairs, which are evaluated in this process instead of re-read.
+    """
+    root = Path(root)
+    frames = frames or {}
+    cached = pd.read_csv(cache).set_index("key") if cache and Path(cache).exists() else pd.DataFrame()
+    rows, fresh, todo = [], [], []
+    for kind, name in sessions:
+        key = file_hash(root / kind / f"{name}.csv", root / kind / f"{name}_events.csv")
+        row = {"kind": kind, "name": name, "key": key}
+        if key in cached.index:
+            rows.append({**row, **cached.loc[key, METRICS + ["focus_thr"]].to_dict()})
+        elif (kind, name) in frames:
+            fresh.append({**row, **metrics(*frames[kind, name])})
+        else:
+            todo.append(row)
+    workers = min(workers or os.cpu_count() or 1, max(len(todo), 1))
+    jobs = [(r["kind"], r["name"], root) for r in todo]
+    if workers == 1:
+        results = [session_metrics(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_comfort,
+                                 initargs=(COMFORT_LOW, COMFORT_HIGH)) as pool:
+            results = list(pool.map(session_metrics, jobs, chunksize=max(1, len(jobs) // (workers * 8))))
+    fresh += [{**r, **m} for r, m in zip(todo, results)]
+    cols = ["kind", "name", "key"] + METRICS + ["focus_thr"]
+    if cache and fresh:
+        new = pd.DataFrame(fresh, columns=cols).drop_duplicates("key").set_index("key")[METRICS + ["focus_thr"]]
+        Path(cache).parent.mkdir(parents=True, exist_ok=True)
+        pd.concat([cached, new]).rename_axis("key").to_csv(cache)
+    res = pd.DataFrame(rows + fresh, columns=cols)
+    return res.sort_values(["kind", "name"], ignore_index=True)
+
+def bootstrap_means(x, boot=None, rng=None, chunk=1_000_000):
+    """
+    (boot, n_metrics) bootstrap means of the rows of x (n, n_metrics), all
+    resamples at once: each resample is a row of multinomial counts, so the
+    means are one matrix product. Worked in chunks of ~`chunk` counts.
+    """
+    boot = BOOT if boot is None else boot
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    rng = rng if rng is not None else np.random.default_rng(SEED)
+    step = max(1, chunk // max(n, 1))
+    out = [rng.multinomial(n, np.full(n, 1.0 / n), size=min(step, boot - b)) @ x / n
+           for b in range(0, boot, step)]
+    return np.vstack(out)
+
+def compare(res, boot=None, ci=None, seed=None):
+    """
+    Per-arm distribution of every metric (n, mean, sd, quartiles) with a
+    bootstrap CI of the mean, plus an 'intervention - baseline' row holding
+    the bootstrap CI of the difference in means. Arguments left as None take
+    BOOT / CI / SEED as they are at call time (pipeline.py --set overrides).
+    """
+    boot = BOOT if boot is None else boot
+    ci = CI if ci is None else ci
+    seed = SEED if seed is None else seed
+    rng = np.random.default_rng(seed)
+    q = [(1 - ci) / 2 * 100, (1 + ci) / 2 * 100]
+    rows, boots = [], {}
+    for kind in KINDS:
+        x = res.loc[res["kind"] == kind, METRICS].to_numpy(float)
+        if len(x) == 0:
+            continue
+        boots[kind] = bootstrap_means(x, boot, rng)
+        lo, hi = np.percentile(boots[kind], q, axis=0)
+        p25, p50, p75 = np.percentile(x, [25, 50, 75], axis=0)
+        for j, m in enumerate(METRICS):
+            rows.append({"arm": kind, "metric": m, "n": len(x), "mean": x[:, j].mean(),
+                         "sd": x[:, j].std(ddof=1) if len(x) > 1 else np.nan,
+                         "p25": p25[j], "median": p50[j], "p75": p75[j],
+                         "ci_lo": lo[j], "ci_hi": hi[j]})
+    if len(boots) == 2:
+        d = boots["intervention"] - boots["baseline"]
+        lo, hi = np.percentile(d, q, axis=0)
+        for j, m in enumerate(METRICS):
+            mean = next(r["mean"] for r in rows if r["arm"] == "intervention" and r["metric"] == m) \
+                 - next(r["mean"] for r in rows if r["arm"] == "baseline" and r["metric"] == m)
+            rows.append({"arm": "intervention - baseline", "metric": m, "n": np.nan, "mean": mean,
+                         "ci_lo": lo[j], "ci_hi": hi[j]})
+    return pd.DataFrame(rows).astype({"n": "Int64"})
+
+def bar_plot(summary, outpath, ci=None):
+    ci = CI if ci is None else ci
     labels = ["Comfort (min)", "Focus (min)", "App unlocks/hr"]
-    b = [np.mean([r["comfort_min"] for r in res_baseline]),
-         np.mean([r["focus_min"] for r in res_baseline]),
-         np.mean([r["rate_app"] for r in res_baseline])]
-    i = [np.mean([r["comfort_min"] for r in res_intervention]),
-         np.mean([r["focus_min"] for r in res_intervention]),
-         np.mean([r["rate_app"] for r in res_intervention])]
+    arm = lambda k: summary[summary["arm"] == k].set_index("metric").reindex(METRICS)
+    b, i = arm("baseline"), arm("intervention")
+    err = lambda a: np.vstack((a["mean"] - a["ci_lo"], a["ci_hi"] - a["mean"]))
 
     x = np.arange(len(labels))
     w = 0.38
     plt.figure(figsize=(8,4.5))
-    plt.bar(x-w/2, b, width=w, label="Baseline")
-    plt.bar(x+w/2, i, width=w, label="Intervention")
+    plt.bar(x-w/2, b["mean"], width=w, yerr=err(b), capsize=3, label=f"Baseline (n={b['n'].iloc[0]:.0f})")
+    plt.bar(x+w/2, i["mean"], width=w, yerr=err(i), capsize=3, label=f"Intervention (n={i['n'].iloc[0]:.0f})")
     plt.xticks(x, labels)
-    plt.ylabel("Value")
+    plt.ylabel(f"Mean ({ci:.0%} bootstrap CI)")
     plt.title("Baseline vs Intervention (synthetic)")
     plt.legend(frameon=False)
     plt.tight_layout()
@@ -70,15 +206,8 @@ def timeline(df, ev, title, outpath):
     ax1.set_ylabel("HI (°C)"); ax1.grid(True, alpha=0.25)
     # Fidget with occupied shading
     ax2.plot(t, df["fidget"], lw=1.2)
-    occ = df["occupied"].to_numpy()
     # shade occupied
-    start=None
-    for i in range(len(df)):
-        if occ[i]==1 and start is None: start=i
-        if (occ[i]==0 and start is not None) or (i==len(df)-1 and start is not None):
-            end = i if occ[i]==0 else i
-            ax2.axvspan(t.iloc[start], t.iloc[end], color="lightblue", alpha=0.08)
-            start=None
+    IntervalShade(ax2).update(t, df["occupied"].to_numpy())
     ax2.set_ylabel("Fidget"); ax2.grid(True, alpha=0.25)
     # Phone events strip (per-app markers)
     if not ev.empty:
@@ -102,40 +231,36 @@ def timeline(df, ev, title, outpath):
     plt.savefig(outpath)
     plt.close()
 
-def main():
-    # load sessions
-    pairs = [
-        ("baseline","2025-09-26_A"),
-        ("baseline","2025-09-26_B"),
-        ("intervention","2025-09-27_A"),
-        ("intervention","2025-09-27_B"),
-    ]
-    res_b, res_i = [], []
-    # compute metrics & save timelines for one example of each
-    for kind, name in pairs:
-        df, ev = load_pair(kind, name)
-        m = metrics(df, ev)
-        if kind=="baseline": res_b.append(m)
-        else: res_i.append(m)
-
-    # bars
-    bar_plot(res_b, res_i, OUTIMG / "validation_bars_synth.png")
-
-    # timelines for one baseline & one intervention
-    df_b, ev_b = load_pair("baseline", "2025-09-26_A")
-    df_i, ev_i = load_pair("intervention", "2025-09-27_A")
-    timeline(df_b, ev_b, "Baseline (synthetic)", OUTIMG / "validation_timeline_baseline_synth.png")
-    timeline(df_i, ev_i, "Intervention (synthetic)", OUTIMG / "validation_timeline_intervention_synth.png")
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare baseline and intervention sessions.")
+    ap.add_argument("--root", type=Path, default=DATA, help="folder holding baseline/ and intervention/")
+    ap.add_argument("--workers", type=int, default=None, help="default: all cores")
+    ap.add_argument("--boot", type=int, default=BOOT, help="bootstrap resamples")
+    ap.add_argument("--ci", type=float, default=CI, help="confidence level of the intervals")
+    ap.add_argument("--seed", type=int, default=SEED, help="bootstrap seed")
+    ap.add_argument("--no-cache", action="store_true")
+    args = ap.parse_args(argv)
+
+    sessions = discover(args.root)
+    if not any(k == "baseline" for k, _ in sessions) or not any(k == "intervention" for k, _ in sessions):
+        raise SystemExit(f"need sessions under {args.root}/baseline and {args.root}/intervention")
+
+    # timelines for the first session of each arm; loaded once, also used for its metrics
+    examples = {k: next(s for s in sessions if s[0] == k) for k in KINDS}
+    frames = {s: load_pair(*s, root=args.root) for s in examples.values()}
+    timeline(*frames[examples["baseline"]], "Baseline (synthetic)", OUTIMG / "validation_timeline_baseline_synth.png")
+    timeline(*frames[examples["intervention"]], "Intervention (synthetic)", OUTIMG / "validation_timeline_intervention_synth.png")
+
+    t0 = time.perf_counter()
+    res = evaluate(sessions, args.root, args.workers, frames, cache=None if args.no_cache else CACHE)
+    summary = compare(res, args.boot, args.ci, args.seed)
+    bar_plot(summary, OUTIMG / "validation_bars_synth.png", args.ci)
 
     # print headline numbers
-    def summarize(tag, res):
-        print(f"\n{tag}:")
-        print("  Comfort min (avg):   ", np.mean([r['comfort_min'] for r in res]).round(1))
-        print("  Focus min (avg):     ", np.mean([r['focus_min']   for r in res]).round(1))
-        print("  App unlocks/hr (avg):", np.mean([r['rate_app']    for r in res]).round(2))
-
-    summarize("Baseline", res_b)
-    summarize("Intervention", res_i)
+    print(f"{len(res)} sessions evaluated in {time.perf_counter() - t0:.1f}s"
+          f" (means with {args.ci:.0%} bootstrap CI, {args.boot} resamples)")
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        print(summary.round(3).to_string(index=False))
     print("\nWrote figures to:", OUTIMG)
 
 if __name__ == "__main__":
@@ -1,12 +1,26 @@
-import numpy as np, pandas as pd, math, random
+import argparse, itertools, os, time, numpy as np, pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import datetime, timedelta
+
+# Synthetic FocusAir sessions, fully vectorized so weeks of 4 Hz data take
+# seconds (load tests for the analysis pipeline):
+#
+#   python simulate_sessions.py                    # the four 30 min sessions under data/
+#   python simulate_sessions.py --minutes 10080    # same four, one week long each
+#   python simulate_sessions.py --seeds 500 --minutes 30 240
+#       # 2 kinds x 500 seeds x 2 lengths on all cores, under data/sim/ + manifest.csv
+
+try:
+    from scipy.signal import lfilter  # pip install scipy
+except ImportError:
+    lfilter = None
 
 # ----------------- config -----------------
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 OUT_BASE = PROJECT_ROOT / "data"
 SEED = 225
-random.seed(SEED); np.random.seed(SEED)
+SIM_DIR = OUT_BASE / "sim"
+START = "2025-09-26T10:00:00"
 
 # durations (minutes) and sampling rate
 SESSION_MIN = 30
@@ -21,144 +35,247 @@ APP_P = [0.4, 0.4, 0.2]
 COMFORT_LOW = 24.0
 COMFORT_HIGH = 27.0
 
+# phone event model: hazards per second, damped right after an event
+KINDS = ["baseline", "intervention"]
+BASE_LAMBDA = {"baseline": 0.020, "intervention": 0.010}
+HEAT_BONUS = {"baseline": 0.015, "intervention": 0.005}   # intervention: nudge effect
+APP_OPEN_P = {"baseline": 0.55, "intervention": 0.35}
+REFRACTORY_S = 8.0
+REFRACTORY_DAMP = 0.1
+
+FIDGET_ALPHA = 0.05   # light EMA smoothing: y[i] = 0.95*y[i-1] + 0.05*x[i]
+
 def heat_index_c(temp_c, rh):
-    """Steadily match your firmware’s behavior: below ~26 C, HI ~ temp."""
-    if temp_c < 26.0:
-        return float(temp_c)
-    Tf = temp_c*1.8 + 32.0
-    R = rh
+    """
+    Steadily match your firmware's behavior: below ~26 C, HI ~ temp, above it
+    the Rothfusz regression. Element-wise over arrays; scalars give a float.
+    """
+    t = np.asarray(temp_c, dtype=float)
+    R = np.asarray(rh, dtype=float)
+    Tf = t*1.8 + 32.0
     HI = (-42.379 + 2.04901523*Tf + 10.14333127*R
           - 0.22475541*Tf*R - 0.00683783*Tf*Tf - 0.05481717*R*R
           + 0.00122874*Tf*Tf*R + 0.00085282*Tf*R*R - 0.00000199*Tf*Tf*R*R)
-    return (HI - 32.0)/1.8
+    out = np.where(t < 26.0, t, (HI - 32.0)/1.8)
+    return float(out) if out.ndim == 0 else out
+
+def ema(x, alpha=FIDGET_ALPHA):
+    """y[0] = x[0], y[i] = (1-alpha)*y[i-1] + alpha*x[i], as one IIR filter pass."""
+    x = np.asarray(x, dtype=float)
+    if len(x) < 2:
+        return x.copy()
+    a = 1.0 - alpha
+    if lfilter is not None:
+        rest, _ = lfilter([alpha], [1.0, -a], x[1:], zi=[a * x[0]])
+        return np.concatenate(([x[0]], rest))
+    # no scipy: closed form per block of B samples (a**-B stays well inside float range)
+    B = 256
+    y = np.empty_like(x)
+    y[0] = x[0]
+    pw = a ** np.arange(1, B + 1)
+    prev = x[0]
+    for s in range(1, len(x), B):
+        blk = x[s:s + B]
+        p = pw[:len(blk)]
+        y[s:s + B] = p * (prev + np.cumsum(alpha * blk / p))
+        prev = y[s + len(blk) - 1]
+    return y
+
+def mark_runs(n, starts, lengths):
+    """Boolean mask of length n, True on [start, start+length) for every run (overlaps fine)."""
+    d = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(d, np.clip(starts, 0, n), 1)
+    np.add.at(d, np.clip(starts + lengths, 0, n), -1)
+    return np.cumsum(d[:n]) > 0
+
+def sample_events(t_s, lam, rng, refractory_s=REFRACTORY_S, damp=REFRACTORY_DAMP):
+    """
+    Sample indices of phone events from a per-second hazard `lam`, one uniform
+    per sample: an event fires when u < lam*DT, or u < damp*lam*DT within
+    `refractory_s` of the previous event. Every sample is drawn at once; only
+    the sparse candidates (u < lam*DT) are walked to apply the refractory rule.
+    """
+    p = lam * DT
+    u = rng.random(len(p))
+    cand = np.flatnonzero(u < p)
+    strong = u[cand] < damp * p[cand]   # fires even inside the refractory window
+    keep = np.ones(len(cand), dtype=bool)
+    last = -np.inf
+    for k, (t, s) in enumerate(zip(t_s[cand].tolist(), strong.tolist())):
+        if s or t - last >= refractory_s:
+            last = t
+        else:
+            keep[k] = False
+    return cand[keep]
 
-def synth_session(kind="baseline", name="2025-09-26_A"):
+def simulate(kind="baseline", minutes=SESSION_MIN, rng=None, start=START):
     """
+    (sensor DataFrame, events DataFrame) for one synthetic session.
     kind: 'baseline' or 'intervention'
-    Produces:
-      - sensor CSV at week-9/data/<kind>/<name>.csv
-      - app events at week-9/data/<kind>/<name>_events.csv
     Model:
       baseline: more time hot, higher phone event rate
       intervention: nudge kicks in to cool & reduce phone rate after hot streaks
+    Everything random comes from `rng` (a np.random.Generator; a fresh one
+    seeded with SEED by default), so equal seeds give identical sessions.
+    Longer sessions repeat the 30 min pattern: 2 away gaps and 3 heat peaks each.
     """
-    out_dir = OUT_BASE / kind
-    out_dir.mkdir(parents=True, exist_ok=True)
-    n = int(SESSION_MIN * 60 * FS_HZ)
-    t0 = datetime.fromisoformat("2025-09-26T10:00:00")
-    ts = np.array([t0 + timedelta(seconds=i*DT) for i in range(n)])
-    ms = ((ts - ts[0]).astype("timedelta64[ms]").astype(np.int64))
-
-    # Occupancy: present for most of session with short gaps
-    occupied = np.ones(n, dtype=int)
-    # sprinkle 2 short away gaps
-    for _ in range(2):
-        start = np.random.randint(int(5*FS_HZ), int((SESSION_MIN-5)*60*FS_HZ))
-        length = int(np.random.uniform(10, 30) * FS_HZ)
-        occupied[start:start+length] = 0
+    if rng is None:
+        rng = np.random.default_rng(SEED)
+    n = int(minutes * 60 * FS_HZ)
+    step_ms = int(round(DT * 1000))
+    ms = np.arange(n, dtype=np.int64) * step_ms
+    ts = np.datetime64(start, "ms") + ms.astype("timedelta64[ms]")
+    t_s = ms / 1000.0
+    reps = minutes / SESSION_MIN
+
+    # Occupancy: present for most of session with short 10-30 s away gaps
+    n_gaps = max(1, int(round(2 * reps)))
+    lo, hi_ = int(5*FS_HZ), max(int(5*FS_HZ) + 1, n - int(5*60*FS_HZ))
+    starts = rng.integers(lo, hi_, size=n_gaps)
+    lengths = (rng.uniform(10, 30, size=n_gaps) * FS_HZ).astype(np.int64)
+    occupied = (~mark_runs(n, starts, lengths)).astype(int)
 
     # Temperature/Humidity profiles:
     # start comfortable; baseline drifts warmer; intervention cools faster on hot
-    base_temp = 24.5 + np.cumsum(np.random.normal(0, 0.005, size=n))  # gentle drift
-    if kind == "baseline":
-        temp = base_temp + np.maximum(0, np.sin(np.linspace(0, 6*math.pi, n))) * 3.0  # pushes hot peaks
-    else:
-        temp = base_temp + np.maximum(0, np.sin(np.linspace(0, 6*math.pi, n))) * 1.5  # reduced peaks
+    base_temp = 24.5 + np.cumsum(rng.normal(0, 0.005, size=n))  # gentle drift
+    peaks = np.maximum(0, np.sin(np.linspace(0, 6*np.pi*reps, n)))
+    temp = base_temp + peaks * (3.0 if kind == "baseline" else 1.5)  # reduced peaks on intervention
 
     # humidity around 55–65 % with noise
-    rh = 60 + np.random.normal(0, 3.0, size=n)
-    rh = np.clip(rh, 30, 90)
-
-    hi = np.array([heat_index_c(t, r) for t, r in zip(temp, rh)])
-
-    # PIR: use occupied transitions; raw motion toggles
-    pir_raw = np.zeros(n, dtype=int)
-    # add small bursts of motion when occupied
-    motion = np.zeros(n, dtype=int)
-    burst_idx = np.where(occupied==1)[0]
-    for i in burst_idx[::int(2*FS_HZ)]:
-        if np.random.rand() < 0.05:
-            L = np.random.randint(2, int(1.5*FS_HZ))
-            pir_raw[i:i+L] = 1
-            motion[i:i+L] = 1
-
-    # Fidget: baseline low; rises with heat or around phone events later
-    fidget = np.maximum(0, np.random.normal(0.002, 0.0008, size=n))
+    rh = np.clip(60 + rng.normal(0, 3.0, size=n), 30, 90)
+
+    hi = heat_index_c(temp, rh)
+
+    # PIR: small bursts of motion when occupied, one chance every 2 s
+    slots = np.flatnonzero(occupied == 1)[::int(2*FS_HZ)]
+    burst = slots[rng.random(len(slots)) < 0.05]
+    pir_raw = mark_runs(n, burst, rng.integers(2, int(1.5*FS_HZ), size=len(burst))).astype(int)
+    motion = pir_raw.copy()
+
+    # Fidget: baseline low; rises with heat or around phone events
+    fidget = np.maximum(0, rng.normal(0.002, 0.0008, size=n))
     hot = hi >= 28.0
-    fidget += hot * np.random.normal(0.01, 0.002, size=n)
+    fidget += hot * rng.normal(0.01, 0.002, size=n)
 
     # Phone events (unlock with optional app)
-    # baseline: higher base rate; intervention: rate drops and cools when hot
-    # Poisson-ish per second; then map to nearest sample
-    def gen_events():
-        rows = []
-        last_event_t = None
-        for i in range(n):
-            if occupied[i] == 0:
-                continue
-            # base hazard per sec
-            base_lambda = 0.020 if kind=="baseline" else 0.010  # per second
-            # add heat penalty; intervention reduces when hot (nudge effect)
-            heat_bonus = 0.015 if hot[i] else 0.0
-            if kind == "intervention" and hot[i]:
-                heat_bonus = 0.005  # smaller
-            lam = base_lambda + heat_bonus
-            # thin out bursts (avoid crazy clustering)
-            if last_event_t is not None:
-                delta = (ts[i] - last_event_t).total_seconds()
-                if delta < 8:  # refractory 8s
-                    lam *= 0.1
-            if np.random.rand() < lam * DT:
-                # sometimes plain unlock, sometimes straight into an app
-                open_app = (np.random.rand() < (0.55 if kind=="baseline" else 0.35))
-                app = ""
-                if open_app:
-                    app = np.random.choice(APPS, p=APP_P)
-                rows.append({
-                    "iso_ts": ts[i].isoformat(timespec="seconds"),
-                    "source": "ios",
-                    "type": "unlock",
-                    "app": app,
-                    "note": ""
-                })
-                last_event_t = ts[i]
-                # bump fidget shortly after event to mimic micro-movement
-                j0 = i
-                j1 = min(n, i + int(6*FS_HZ))
-                fidget[j0:j1] += np.linspace(0.01, 0.003, j1-j0)
-        return rows
-
-    events = gen_events()
-
-    # light smoothing on fidget
-    for i in range(1, n):
-        fidget[i] = 0.95*fidget[i-1] + 0.05*fidget[i]
+    lam = (BASE_LAMBDA[kind] + hot * HEAT_BONUS[kind]) * occupied
+    ev = sample_events(t_s, lam, rng)
+    open_app = rng.random(len(ev)) < APP_OPEN_P[kind]
+    app = np.where(open_app, rng.choice(APPS, size=len(ev), p=APP_P), "")
+
+    # bump fidget shortly after each event to mimic micro-movement
+    ramp = np.linspace(0.01, 0.003, int(6*FS_HZ))
+    fidget += np.convolve(np.bincount(ev, minlength=n), ramp)[:n]
+
+    fidget = ema(fidget)
 
+    iso = np.datetime_as_string(ts, unit="s")
     # CSV: iso_ts first for plotting code, then ms + signals
     df = pd.DataFrame({
-        "iso_ts": [t.isoformat(timespec="seconds") for t in ts],
+        "iso_ts": iso,
         "ms": ms,
         "temp_c": np.round(temp, 2),
         "hum_pct": np.round(rh, 1),
         "heat_index_c": np.round(hi, 2),
-        "pir_raw": pir_raw.astype(int),
-        "motion": motion.astype(int),
-        "occupied": occupied.astype(int),
+        "pir_raw": pir_raw,
+        "motion": motion,
+        "occupied": occupied,
         "fidget": np.round(fidget, 4),
     })
+    events = pd.DataFrame({
+        "iso_ts": iso[ev],
+        "source": "ios",
+        "type": "unlock",
+        "app": app,
+        "note": "",
+    })
+    return df, events
 
+def synth_session(kind="baseline", name="2025-09-26_A", minutes=SESSION_MIN, rng=None):
+    """
+    Produces:
+      - sensor CSV at week-9/data/<kind>/<name>.csv
+      - app events at week-9/data/<kind>/<name>_events.csv
+    """
+    out_dir = OUT_BASE / kind
+    out_dir.mkdir(parents=True, exist_ok=True)
+    df, events = simulate(kind, minutes, rng)
     sensor_path = out_dir / f"{name}.csv"
     events_path = out_dir / f"{name}_events.csv"
     df.to_csv(sensor_path, index=False)
-    pd.DataFrame(events)[["iso_ts","source","type","app","note"]].to_csv(events_path, index=False)
+    events.to_csv(events_path, index=False)
     print(f"[sim] wrote {sensor_path} rows={len(df)}; events={len(events)}")
 
-def main():
-    # Two baseline + two intervention sessions
-    synth_session("baseline",      "2025-09-26_A")
-    synth_session("baseline",      "2025-09-26_B")
-    synth_session("intervention",  "2025-09-27_A")
-    synth_session("intervention",  "2025-09-27_B")
+def job_seed(root, kind, seed, minutes):
+    """
+    SeedSequence of one batch session, spawned from `root` with a key made of
+    (kind, seed index, length in seconds) rather than the job's position, so a
+    session's data does not depend on what else was in the batch and can be
+    regenerated on its own from the manifest's entropy + spawn_key.
+    """
+    return np.random.SeedSequence(root, spawn_key=(KINDS.index(kind), seed, int(round(minutes * 60))))
+
+def run_job(job):
+    """Worker: simulate one (kind, seed, minutes) session, write it, return its manifest row."""
+    kind, seed, minutes, root, out, width = job
+    t0 = time.perf_counter()
+    ss = job_seed(root, kind, seed, minutes)
+    df, events = simulate(kind, minutes, np.random.default_rng(ss))
+    part = Path(kind) / f"seed={seed:0{width}d}"
+    (out / part).mkdir(parents=True, exist_ok=True)
+    sensor, ev_path = part / f"{minutes:g}min.csv", part / f"{minutes:g}min_events.csv"
+    df.to_csv(out / sensor, index=False)
+    events.to_csv(out / ev_path, index=False)
+    return {"kind": kind, "seed": seed, "minutes": minutes,
+            "entropy": ss.entropy, "spawn_key": "-".join(map(str, ss.spawn_key)),
+            "sensor": sensor.as_posix(), "events": ev_path.as_posix(),
+            "rows": len(df), "n_events": len(events),
+            "app_events": int((events["app"] != "").sum()),
+            "elapsed_s": round(time.perf_counter() - t0, 3)}
+
+def run_batch(kinds, seeds, minutes, out=SIM_DIR, root=SEED, workers=None):
+    """
+    Every kind x seed index (0..seeds-1) x length on a process pool. Sessions
+    land in <out>/<kind>/seed=<i>/<minutes>min.csv (+ _events.csv) and
+    <out>/manifest.csv lists them all, sorted, with their seeds and sizes.
+    """
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    width = max(4, len(str(seeds - 1)))
+    jobs = [(k, s, m, root, out, width) for k, s, m in itertools.product(kinds, range(seeds), minutes)]
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+    if workers == 1:
+        rows = [run_job(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(run_job, jobs, chunksize=max(1, len(jobs) // (workers * 8))))
+    manifest = pd.DataFrame(rows).sort_values(["kind", "seed", "minutes"], ignore_index=True)
+    manifest.to_csv(out / "manifest.csv", index=False)
+    print(f"[sim] {len(manifest)} sessions ({manifest['rows'].sum():,} rows) with {workers} workers"
+          f" in {time.perf_counter() - t0:.1f}s -> {out / 'manifest.csv'}")
+    return manifest
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate synthetic FocusAir sessions.")
+    ap.add_argument("--kinds", nargs="+", default=KINDS, choices=KINDS)
+    ap.add_argument("--seeds", type=int, default=0,
+                    help="seed indices per kind and length; 0 = just the four demo sessions")
+    ap.add_argument("--minutes", nargs="+", type=float, default=[SESSION_MIN])
+    ap.add_argument("--workers", type=int, default=None, help="default: all cores")
+    ap.add_argument("--root-seed", type=int, default=SEED)
+    ap.add_argument("--out", type=Path, default=SIM_DIR)
+    args = ap.parse_args(argv)
+    if args.seeds > 0:
+        run_batch(args.kinds, args.seeds, args.minutes, args.out, args.root_seed, args.workers)
+        return
+    minutes = args.minutes[0]
+    # Two baseline + two intervention sessions, independent streams from one seed
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(args.root_seed).spawn(4)]
+    synth_session("baseline",      "2025-09-26_A", minutes, rngs[0])
+    synth_session("baseline",      "2025-09-26_B", minutes, rngs[1])
+    synth_session("intervention",  "2025-09-27_A", minutes, rngs[2])
+    synth_session("intervention",  "2025-09-27_B", minutes, rngs[3])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,111 @@
+import os, sys, time, numpy as np, pandas as pd
+from pathlib import Path
+
+# Columnar storage for FocusAir logs: each CSV under data/ gets a typed Parquet
+# twin under data/parquet/ (same relative path, one file per day/session), and
+# read_log() prefers the twin whenever it is at least as new as the CSV.
+#
+#   python store.py                      # compact every CSV under data/
+#   python store.py data/2025-09-25.csv  # compact just these
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+DATA_DIR = PROJECT_ROOT / "data"
+PARQUET_DIR = DATA_DIR / "parquet"
+COMPRESSION = "zstd"
+CHUNK_ROWS = 500_000   # iter_log() default: ~20 MB per typed chunk of a full sensor log
+
+FLAGS   = ["pir_raw", "motion", "occupied", "focused", "opened_app"]   # int8
+SIGNALS = ["temp_c", "hum_pct", "heat_index_c", "fidget"]              # float32
+
+# parse-time dtypes for iter_log(): NaN-safe floats, narrowed by typed() per chunk
+CSV_DTYPES = {**{c: np.float32 for c in FLAGS + SIGNALS}, "ms": np.float64, "session_id": np.float64}
+
+try:
+    import pyarrow  # pip install pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+def typed(df):
+    """Cast known columns to their storage types; iso_ts becomes datetime64."""
+    for c in FLAGS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype(np.int8)
+    for c in SIGNALS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(np.float32)
+    if "ms" in df.columns:
+        ms = pd.to_numeric(df["ms"], errors="coerce")
+        df["ms"] = ms.astype(np.int64) if ms.notna().all() else ms
+    if "session_id" in df.columns:
+        # 0 is "no session", as the sessionizer writes it; a blank/NaN id must not abort the cast
+        df["session_id"] = pd.to_numeric(df["session_id"], errors="coerce").fillna(0).astype(np.int32)
+    if "iso_ts" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["iso_ts"]):
+        df["iso_ts"] = pd.to_datetime(df["iso_ts"], errors="coerce")
+    return df
+
+def parquet_path(csv_path):
+    p = Path(csv_path).resolve()
+    try:
+        rel = p.relative_to(DATA_DIR)
+    except ValueError:
+        return p.with_suffix(".parquet")   # outside data/: keep it alongside
+    return (PARQUET_DIR / rel).with_suffix(".parquet")
+
+def compact(csv_path):
+    """Write the typed Parquet twin of one CSV; returns (csv bytes, parquet bytes)."""
+    if pyarrow is None:
+        raise SystemExit("pyarrow is required for Parquet storage: pip install pyarrow")
+    out = parquet_path(csv_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    df = typed(pd.read_csv(csv_path, on_bad_lines="skip"))
+    tmp = out.with_suffix(".parquet.tmp")
+    df.to_parquet(tmp, index=False, compression=COMPRESSION)
+    os.replace(tmp, out)
+    return os.path.getsize(csv_path), os.path.getsize(out)
+
+def read_log(path, columns=None, **csv_kwargs):
+    """
+    Load a log as a typed DataFrame. Reads the Parquet twin when it exists and is
+    up to date (and pyarrow is installed), otherwise parses the CSV itself.
+    `csv_kwargs` only apply to the CSV fallback.
+    """
+    pq = parquet_path(path)
+    if pyarrow is not None and pq.exists() and (
+            not os.path.exists(path) or os.path.getmtime(pq) >= os.path.getmtime(path)):
+        return pd.read_parquet(pq, columns=columns)
+    return typed(pd.read_csv(path, usecols=columns, **csv_kwargs))
+
+def iter_log(path, columns=None, chunksize=CHUNK_ROWS):
+    """
+    read_log() in pieces: yields typed DataFrames of at most `chunksize` rows
+    (int8 flags, float32 signals, int64 ms, datetime64 iso_ts), from the
+    Parquet twin's row batches when it is up to date, otherwise from a chunked
+    CSV reader that parses with explicit dtypes. Memory stays at one chunk
+    whatever the size of the log.
+    """
+    pq = parquet_path(path)
+    if pyarrow is not None and pq.exists() and (
+            not os.path.exists(path) or os.path.getmtime(pq) >= os.path.getmtime(path)):
+        for batch in pyarrow.parquet.ParquetFile(pq).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    with pd.read_csv(path, usecols=columns, dtype=CSV_DTYPES, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield typed(chunk)
+
+def main(paths):
+    if not paths:
+        paths = sorted(p for p in DATA_DIR.rglob("*.csv") if PARQUET_DIR not in p.parents)
+    total_csv = total_pq = 0
+    for p in paths:
+        t0 = time.perf_counter()
+        n_csv, n_pq = compact(p)
+        total_csv += n_csv; total_pq += n_pq
+        print(f"[store] {p} -> {parquet_path(p)}  {n_csv/1e3:.0f} kB -> {n_pq/1e3:.0f} kB"
+              f"  ({time.perf_counter()-t0:.2f}s)")
+    if total_pq:
+        print(f"[store] total {total_csv/1e6:.2f} MB -> {total_pq/1e6:.2f} MB ({total_csv/total_pq:.1f}x smaller)")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,115 @@
+import numpy as np, pandas as pd
+
+# Sensor <-> phone event joins on sorted int64 nanosecond timestamps. Every
+# per-event lookup is a binary search (np.searchsorted) into the sensor times,
+# so joining months of 4 Hz rows with their events costs O(log n) per event
+# instead of a mask over the whole frame:
+#
+#   idx = SensorIndex(read_log("data/2025-09-25.sessions.csv"))
+#   ev = idx.attach(read_log("data/events_clean.csv"))      # + session_id, hot, fidget context...
+#   hot = idx.during(ev["iso_ts"], (idx.col("occupied") == 1) & (idx.col("heat_index_c") >= 28))
+
+HOT_HI = 28.0        # heat index (C) from which a row counts as hot, as anomalies.HI_THRESHOLD
+TOLERANCE_S = 2.0    # an event takes the state of the last sensor row at most this old
+CONTEXT_S = 30.0     # fidget context: mean over [t - CONTEXT_S, t + CONTEXT_S]
+NAT = np.iinfo(np.int64).min
+
+def to_ns(t):
+    """int64 ns timestamps of datetimes / ISO strings (array or scalar); unparseable -> NAT."""
+    a = pd.to_datetime(t, errors="coerce")
+    if isinstance(a, pd.Timestamp) or a is pd.NaT:
+        return NAT if a is pd.NaT else a.as_unit("ns").value
+    return np.asarray(a, dtype="datetime64[ns]").view(np.int64)
+
+def window(t_ns, t0, t1):
+    """slice of the sorted `t_ns` with t0 <= t <= t1."""
+    return slice(int(np.searchsorted(t_ns, to_ns(t0), "left")), int(np.searchsorted(t_ns, to_ns(t1), "right")))
+
+class SensorIndex:
+    """
+    Sensor rows sorted by time as int64 ns plus their columns as NumPy arrays.
+    Queries take event times and return one value per event: the state of
+    the sensor row in force at that time (the last one at or before it, if
+    no older than `tolerance_s`) or aggregates over a time window.
+    """
+    def __init__(self, df, t="iso_ts", columns=("session_id", "day", "occupied", "heat_index_c", "fidget")):
+        t_ns = to_ns(df[t])
+        keep = slice(None)   # logs are normally complete and in order: no copies then
+        if (t_ns == NAT).any() or (np.diff(t_ns) < 0).any():
+            keep = np.flatnonzero(t_ns != NAT)
+            keep = keep[np.argsort(t_ns[keep], kind="stable")]
+        self.t = t_ns[keep]
+        self.cols = {c: df[c].to_numpy()[keep] for c in columns if c in df.columns}
+        self._prefix = {}
+
+    def __len__(self):
+        return len(self.t)
+
+    def col(self, name):
+        return self.cols[name]
+
+    def locate(self, at, tolerance_s=TOLERANCE_S):
+        """Row index in force at each time in `at`, -1 where there is none."""
+        q = np.atleast_1d(to_ns(at))
+        i = np.searchsorted(self.t, q, "right") - 1
+        bad = (i < 0) | (q == NAT)
+        if tolerance_s is not None and len(self.t):
+            bad |= q - self.t[np.maximum(i, 0)] > int(tolerance_s * 1e9)
+        return np.where(bad, -1, i)
+
+    def state(self, at, col, tolerance_s=TOLERANCE_S, fill=np.nan):
+        """`col` of the row in force at each time (`fill` where there is none)."""
+        i = self.locate(at, tolerance_s)
+        if not len(self.t):
+            return np.full(len(i), fill)
+        return np.where(i >= 0, self.cols[col][np.maximum(i, 0)], fill)
+
+    def during(self, at, cond, tolerance_s=TOLERANCE_S):
+        """Per time in `at`: did `cond` (bool per sensor row) hold at the row in force then?"""
+        i = self.locate(at, tolerance_s)
+        if not len(self.t):
+            return np.zeros(len(i), dtype=bool)
+        return (i >= 0) & np.asarray(cond, dtype=bool)[np.maximum(i, 0)]
+
+    def _prefix_sums(self, col):
+        if col not in self._prefix:
+            v = np.asarray(self.cols[col], dtype=float)
+            ok = ~np.isnan(v)
+            self._prefix[col] = (np.concatenate(([0.0], np.cumsum(np.where(ok, v, 0.0)))),
+                                 np.concatenate(([0], np.cumsum(ok))))
+        return self._prefix[col]
+
+    def window_mean(self, at, col, before_s, after_s=0.0):
+        """Mean of `col` over the rows in [t - before_s, t + after_s] per time (NaN if none)."""
+        q = np.atleast_1d(to_ns(at))
+        s, n = self._prefix_sums(col)
+        lo = np.searchsorted(self.t, q - int(before_s * 1e9), "left")
+        hi = np.searchsorted(self.t, q + int(after_s * 1e9), "right")
+        cnt = n[hi] - n[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = np.where(cnt > 0, (s[hi] - s[lo]) / cnt, np.nan)
+        out[q == NAT] = np.nan
+        return out
+
+    def attach(self, events, t="iso_ts", tolerance_s=TOLERANCE_S, hot_hi=HOT_HI, context_s=CONTEXT_S):
+        """
+        Copy of `events` with the sensor context of each one: session_id (0
+        outside sessions), day, occupied, heat_index_c, hot and fidget in force
+        at the event, plus fidget_ctx, the mean fidget within +-context_s.
+        Columns the sensor frame lacks are skipped.
+        """
+        out = events.copy()
+        at = out[t]
+        i = self.locate(at, tolerance_s)
+        found = i >= 0
+        j = np.maximum(i, 0)
+        for c, fill in (("session_id", 0), ("day", ""), ("occupied", 0)):
+            if c in self.cols:
+                out[c] = np.where(found, self.cols[c][j], fill) if len(self.t) else fill
+        if "heat_index_c" in self.cols:
+            out["heat_index_c"] = self.state(at, "heat_index_c", tolerance_s)
+            out["hot"] = (out["heat_index_c"] >= hot_hi).astype(int)
+        if "fidget" in self.cols:
+            out["fidget"] = self.state(at, "fidget", tolerance_s)
+            out["fidget_ctx"] = self.window_mean(at, "fidget", context_s, context_s) if len(self.t) else np.nan
+        return out
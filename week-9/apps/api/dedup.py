@@ -0,0 +1,127 @@
+import asyncio, sqlite3, threading, time
+from collections import OrderedDict
+
+class DedupCache:
+    """
+    Per-process "seen this key in the last ttl seconds?" check. Keys sit in an
+    OrderedDict in the order they were last accepted, each with the wall-clock
+    time it was accepted at, and every key shares the same ttl, so the oldest
+    entries are always at the front: expiry pops from the front (O(1)
+    amortised) and the size is capped at max_entries (LRU). Duplicates are
+    judged on the events' own timestamps, expiry on the wall clock, so neither
+    back-dated nor future-dated events can flush the live keys.
+    """
+    def __init__(self, ttl, max_entries=10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._last = OrderedDict()   # key -> (ts of the last accepted event, wall clock when accepted)
+        self.hits = self.misses = self.evictions = 0
+
+    def _expire(self, clock):
+        last = self._last
+        while last:
+            key, (_, at) = next(iter(last.items()))
+            if clock - at < self.ttl:
+                break
+            last.popitem(last=False)
+            self.evictions += 1
+
+    def seen(self, key, now=None):
+        """
+        True if `key` was accepted within ttl seconds of `now`; otherwise record
+        it. `now` may be an event's own (possibly older, buffered) timestamp;
+        one in the future counts as the current time.
+        """
+        clock = time.time()
+        now = clock if now is None else min(now, clock)
+        self._expire(clock)
+        last = self._last.get(key, (None,))[0]
+        if last is not None and abs(now - last) < self.ttl:
+            self.hits += 1
+            return True
+        self.misses += 1
+        self._last[key] = (now if last is None else max(now, last), clock)
+        self._last.move_to_end(key)
+        if len(self._last) > self.max_entries:
+            self._last.popitem(last=False)
+            self.evictions += 1
+        return False
+
+    def seen_many(self, items):
+        """seen(key, now) of each (key, now) pair, in order."""
+        return [self.seen(key, now) for key, now in items]
+
+    async def seen_many_async(self, items):
+        # in memory and O(1) per key: cheaper to stay on the event loop
+        return self.seen_many(items)
+
+    def stats(self):
+        return {"backend": "memory", "ttl_s": self.ttl, "size": len(self._last),
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+class SqliteDedup:
+    """
+    Same check backed by a local SQLite table, so several uvicorn workers on one
+    machine dedupe consistently. The accept-or-skip decision is a single UPSERT,
+    which SQLite serialises across processes. Expired rows are purged at most
+    once per ttl. Hit/miss/evict counts are per process.
+
+    Queries block, and while another worker holds the write lock for up to the
+    5 s busy timeout, so async handlers go through seen_many_async(), which
+    runs a whole batch in one transaction on a worker thread.
+    """
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self.db = sqlite3.connect(str(path), timeout=5.0, isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=OFF")   # dedup state is disposable
+        self.db.execute("CREATE TABLE IF NOT EXISTS dedup (key TEXT PRIMARY KEY, ts REAL NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS dedup_ts ON dedup (ts)")
+        self.lock = threading.Lock()
+        self.next_purge = 0.0
+        self.hits = self.misses = self.evictions = 0
+
+    def seen(self, key, now=None):
+        with self.lock:
+            return self._seen(key, now)
+
+    def seen_many(self, items):
+        """seen() of each (key, now) pair, in order, in a single transaction."""
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                out = [self._seen(key, now) for key, now in items]
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            return out
+
+    async def seen_many_async(self, items):
+        return await asyncio.to_thread(self.seen_many, items)
+
+    def _seen(self, key, now):
+        # a future-dated event counts as now: it must not purge live keys or push next_purge out
+        now = time.time() if now is None else min(now, time.time())
+        if now >= self.next_purge:
+            cur = self.db.execute("DELETE FROM dedup WHERE ts <= ?", (now - self.ttl,))
+            self.evictions += cur.rowcount
+            self.next_purge = now + self.ttl
+        # inserts a new key or refreshes one outside the window; a live key is left alone
+        cur = self.db.execute(
+            "INSERT INTO dedup (key, ts) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET ts = max(dedup.ts, excluded.ts) "
+            "WHERE abs(excluded.ts - dedup.ts) >= ?",
+            (key, now, self.ttl))
+        if cur.rowcount:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def stats(self):
+        with self.lock:
+            size = self.db.execute("SELECT COUNT(*) FROM dedup").fetchone()[0]
+        return {"backend": "sqlite", "ttl_s": self.ttl, "size": size,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,41 @@
+import asyncio
+
+class EventHub:
+    """
+    Fan-out of accepted events to live subscribers (the /phone/stream SSE
+    endpoint). Each subscriber gets its own bounded asyncio queue; a viewer that
+    stops reading loses its oldest queued events rather than holding memory or
+    slowing down ingestion. publish() never blocks and must run on the loop.
+    """
+    def __init__(self, queue_max=256):
+        self.queue_max = queue_max
+        self.subs = set()
+        self.published = self.dropped = 0
+
+    def subscribe(self):
+        q = asyncio.Queue(maxsize=self.queue_max)
+        self.subs.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        self.subs.discard(q)
+
+    def publish(self, rows):
+        self.published += len(rows)
+        for q in self.subs:
+            for r in rows:
+                if q.full():
+                    q.get_nowait()   # drop this subscriber's oldest
+                    self.dropped += 1
+                q.put_nowait(r)
+
+    def close(self):
+        """Tell every subscriber to finish (None sentinel), e.g. on shutdown."""
+        for q in self.subs:
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(None)
+
+    def stats(self):
+        return {"subscribers": len(self.subs), "published": self.published,
+                "dropped": self.dropped}
@@ -0,0 +1,72 @@
+import bisect, csv, heapq, os
+from collections import Counter
+
+class EventIndex:
+    """
+    In-memory, time-sorted copy of events.csv for the query endpoints. Loaded
+    once at startup and then fed by EventStore after each write, so queries are
+    two bisects over the iso_ts keys instead of a CSV re-parse. iso_ts strings
+    are fixed-width local time, so string order is time order and prefixes like
+    "2025-09-25" or "2025-09-25T14" work as bounds. Not thread-safe: writes
+    and queries must all run on the event loop.
+    """
+    def __init__(self):
+        self.keys = []   # iso_ts, sorted
+        self.rows = []   # row dicts, same order as keys
+
+    def load(self, path):
+        self.keys, self.rows = [], []
+        if not os.path.exists(path):
+            return self
+        with open(path, newline="") as f:
+            rows = [r for r in csv.DictReader(f) if r.get("iso_ts")]
+        rows.sort(key=lambda r: r["iso_ts"])   # stable: file order within a second
+        self.rows = rows
+        self.keys = [r["iso_ts"] for r in rows]
+        return self
+
+    def add_many(self, rows):
+        if not rows:
+            return
+        keys = [r["iso_ts"] for r in rows]
+        if (not self.keys or keys[0] >= self.keys[-1]) and all(a <= b for a, b in zip(keys, keys[1:])):
+            self.keys.extend(keys); self.rows.extend(rows)
+            return
+        # back-dated rows (batch upload): sort the batch once and merge it into
+        # the tail it overlaps, after equal keys, instead of a list.insert per row
+        new = sorted(zip(keys, rows), key=lambda kr: kr[0])
+        i = bisect.bisect_right(self.keys, new[0][0])
+        merged = list(heapq.merge(zip(self.keys[i:], self.rows[i:]), new, key=lambda kr: kr[0]))
+        self.keys[i:] = [k for k, _ in merged]
+        self.rows[i:] = [r for _, r in merged]
+
+    def _span(self, since=None, until=None):
+        """Index range for since <= iso_ts < until (either bound optional)."""
+        lo = bisect.bisect_left(self.keys, since) if since else 0
+        hi = bisect.bisect_left(self.keys, until) if until else len(self.keys)
+        return lo, max(lo, hi)
+
+    def query(self, since=None, until=None, app=None, etype=None, limit=None):
+        lo, hi = self._span(since, until)
+        rows = self.rows[lo:hi]
+        if app is not None:
+            rows = [r for r in rows if r.get("app") == app]
+        if etype is not None:
+            rows = [r for r in rows if r.get("type") == etype]
+        if limit is not None:
+            rows = rows[-limit:] if limit > 0 else []   # most recent `limit`
+        return rows
+
+    def stats(self, since=None, until=None):
+        lo, hi = self._span(since, until)
+        rows = self.rows[lo:hi]
+        return {
+            "count": len(rows),
+            "first": rows[0]["iso_ts"] if rows else None,
+            "last": rows[-1]["iso_ts"] if rows else None,
+            "by_type": dict(Counter(r.get("type", "") for r in rows).most_common()),
+            "by_app": dict(Counter(r.get("app", "") for r in rows if r.get("app")).most_common()),
+        }
+
+    def __len__(self):
+        return len(self.keys)
@@ -0,0 +1,86 @@
+import asyncio, csv, io, logging, os
+
+log = logging.getLogger(__name__)
+
+class EventStore:
+    """
+    Append-only events CSV behind an asyncio queue. One background task owns the
+    open file handle; concurrent append() calls that arrive while it is writing
+    are group-committed with a single write + flush, and each caller resumes once
+    its rows are on disk. close() drains the queue before closing the file.
+    `on_write(rows)` (optional) is called on the event loop with every batch of
+    rows once it is on disk, e.g. to keep an in-memory index current; if it
+    raises, the error is logged and the rows still count as written.
+    """
+    def __init__(self, path, fields, batch_max=512, on_write=None):
+        self.path = path
+        self.fields = fields
+        self.batch_max = batch_max
+        self.on_write = on_write
+        self.queue = None
+        self.task = None
+        self.f = None
+
+    async def start(self):
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.f = open(self.path, "a", newline="")
+        if new:
+            csv.DictWriter(self.f, fieldnames=self.fields).writeheader()
+            self.f.flush()
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def append(self, row):
+        await self.append_many([row])
+
+    async def append_many(self, rows):
+        if not rows:
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((rows, fut))
+        await fut
+
+    def _write(self, batch):
+        buf = io.StringIO()
+        w = csv.DictWriter(buf, fieldnames=self.fields, extrasaction="ignore")
+        for rows, _ in batch:
+            w.writerows(rows)
+        self.f.write(buf.getvalue())
+        self.f.flush()
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_max or self.queue.empty():
+                    break
+                item = self.queue.get_nowait()
+            stopping = item is None
+            if not batch:
+                continue
+            try:
+                # off the event loop, so handlers keep queueing the next batch
+                await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done(): fut.set_exception(e)
+                continue
+            if self.on_write is not None:
+                try:
+                    self.on_write([r for rows, _ in batch for r in rows])
+                except Exception:
+                    # the rows are on disk: a broken consumer must not stall the writers
+                    log.exception("EventStore on_write callback failed")
+            for _, fut in batch:
+                if not fut.done(): fut.set_result(None)
+
+    async def close(self):
+        if self.task is None:
+            return
+        self.queue.put_nowait(None)
+        await self.task
+        self.task = None
+        self.f.close()
@@ -0,0 +1,41 @@
+import asyncio, sys, time
+import httpx  # pip install httpx
+
+# Load test for the phone event API: CLIENTS concurrent clients post events for
+# SECONDS and report sustained requests/sec and latency. Each event uses a fresh
+# app name so the dedup window doesn't short-circuit the write path.
+#
+#   uvicorn server:app --port 8000       (in apps/api)
+#   python loadtest.py [URL] [CLIENTS] [SECONDS]
+
+URL = "http://127.0.0.1:8000"
+CLIENTS = 50
+SECONDS = 10.0
+
+async def client(http, cid, deadline, lat):
+    i = 0
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        r = await http.post("/phone/event", json={
+            "source": "loadtest", "type": "unlock", "app": f"bench-{cid}-{i}", "note": ""})
+        r.raise_for_status()
+        lat.append(time.perf_counter() - t0)
+        i += 1
+
+async def main():
+    url = sys.argv[1] if len(sys.argv) > 1 else URL
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else CLIENTS
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else SECONDS
+    lat = []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as http:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client(http, c, t0 + seconds, lat) for c in range(clients)))
+        elapsed = time.perf_counter() - t0
+    lat.sort()
+    pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1e3
+    print(f"{url}  clients={clients}  requests={len(lat)}  {len(lat) / elapsed:,.0f} req/s"
+          f"  p50={pct(0.5):.1f}ms  p99={pct(0.99):.1f}ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
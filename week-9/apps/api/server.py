@@ -1,31 +1,83 @@
 # apps/api/server.py
 from pathlib import Path
 from datetime import datetime, timedelta
-import csv, json, time
+from contextlib import asynccontextmanager
+import asyncio, json, os, signal, sys, threading
+from typing import Optional
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from urllib.parse import parse_qs, urlparse
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from event_store import EventStore
+from dedup import DedupCache, SqliteDedup
+from event_index import EventIndex
+from event_hub import EventHub
+
+try:
+    import orjson  # optional, faster batch parsing
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 DATA_DIR = PROJECT_ROOT / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 EVENTS_CSV = DATA_DIR / "events.csv"
 FIELDS = ["iso_ts", "source", "type", "app", "note"]
 
-app = FastAPI(title="FocusAir Phone Events")
+# single writer task for events.csv (see event_store.py); every written batch
+# also lands in the in-memory index the query endpoints read from and is pushed
+# to /phone/stream subscribers. With several uvicorn workers each one only
+# indexes and pushes the events it wrote itself.
+index = EventIndex()
+hub = EventHub(queue_max=int(os.getenv("STREAM_QUEUE_MAX", "256")))
+STREAM_KEEPALIVE_S = 15.0
+
+def on_write(rows):
+    index.add_many(rows)
+    hub.publish(rows)
+
+store = EventStore(EVENTS_CSV, FIELDS, on_write=on_write)
+
+# uvicorn only runs the lifespan shutdown after every connection has closed,
+# and a /phone/stream viewer never closes on its own: Ctrl+C would hang for as
+# long as one is connected. So the streams are ended as soon as SIGINT/SIGTERM
+# arrives, ahead of uvicorn's own handler and its connection drain.
+shutting_down = asyncio.Event()
+
+def end_streams():
+    shutting_down.set()
+    hub.close()
+
+def chain_exit_signals(loop):
+    """Run end_streams() on the loop, then the handler already installed (uvicorn's)."""
+    if threading.current_thread() is not threading.main_thread():
+        return   # e.g. TestClient: signals are not ours to handle
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        prev = signal.getsignal(sig)
+        def handler(signum, frame, prev=prev):
+            loop.call_soon_threadsafe(end_streams)
+            if callable(prev):
+                prev(signum, frame)
+        signal.signal(sig, handler)
+
+@asynccontextmanager
+async def lifespan(app):
+    index.load(EVENTS_CSV)
+    await store.start()
+    chain_exit_signals(asyncio.get_running_loop())
+    yield
+    await store.close()   # flush whatever is still queued
+    hub.close()
+
+app = FastAPI(title="FocusAir Phone Events", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware, allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"]
 )
 
-def append_event(row: dict):
-    exists = EVENTS_CSV.exists()
-    with open(EVENTS_CSV, "a", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=FIELDS)
-        if not exists: w.writeheader()
-        w.writerow(row)
-
 def try_parse_json_field(x):
     if not isinstance(x, str): return None
     s = x.strip()
@@ -36,19 +88,97 @@ def try_parse_json_field(x):
     except Exception:
         return None
 
-# in-memory dedupe cache
-_last_seen = {}  # key -> last_ts (unix)
-DEDUP_SECONDS = 10
+# dedupe identical (source, type, app) within DEDUP_SECONDS. DEDUP_BACKEND=sqlite
+# shares the window across uvicorn workers through data/dedup.sqlite
+DEDUP_SECONDS = float(os.getenv("DEDUP_SECONDS", "10"))
+DEDUP_MAX = int(os.getenv("DEDUP_MAX", "10000"))
+DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "memory")
+dedup = (SqliteDedup(DATA_DIR / "dedup.sqlite", DEDUP_SECONDS) if DEDUP_BACKEND == "sqlite"
+         else DedupCache(DEDUP_SECONDS, DEDUP_MAX))
 
 @app.get("/")
 def root():
     return {"ok": True, "events_csv": str(EVENTS_CSV)}
 
+@app.get("/dedup/stats")
+def dedup_stats():
+    return dedup.stats()
+
+# the query endpoints are async so they run on the loop, like the writes that
+# feed the index: a threadpool query could see keys and rows out of step
+@app.get("/phone/events")
+async def phone_events(since: Optional[str] = None, until: Optional[str] = None,
+                 app: Optional[str] = None, type: Optional[str] = None,
+                 limit: Optional[int] = None):
+    """Stored events with since <= iso_ts < until (ISO prefixes like 2025-09-25 work)."""
+    rows = index.query(since, until, app=app.lower() if app else None,
+                       etype=type.lower() if type else None, limit=limit)
+    return {"count": len(rows), "events": rows}
+
+@app.get("/phone/stats")
+async def phone_stats(since: Optional[str] = None, until: Optional[str] = None):
+    return {"total": len(index), **index.stats(since, until)}
+
+@app.get("/phone/stream")
+async def phone_stream(req: Request, since: Optional[str] = None):
+    """
+    Server-sent events: one `data: {json row}` message per accepted event, as
+    soon as it is on disk. `since` first replays stored events with
+    iso_ts >= since (for reconnects); comment lines keep idle proxies open.
+    """
+    q = hub.subscribe()
+    backlog = index.query(since) if since else []   # same tick as subscribe: no gap
+
+    async def gen():
+        try:
+            for r in backlog:
+                yield f"data: {json.dumps(r)}\n\n"
+            while not shutting_down.is_set():
+                try:
+                    r = await asyncio.wait_for(q.get(), STREAM_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    if await req.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if r is None:
+                    break
+                yield f"data: {json.dumps(r)}\n\n"
+        finally:
+            hub.unsubscribe(q)
+
+    return StreamingResponse(gen(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/phone/stream/stats")
+def phone_stream_stats():
+    return hub.stats()
+
 @app.get("/test")
-def test():
+async def test():
     row = {"iso_ts": datetime.now().isoformat(timespec="seconds"),
            "source":"browser","type":"test_ping","app":"","note":"manual"}
-    append_event(row); return {"ok": True, "saved": row}
+    await store.append(row); return {"ok": True, "saved": row}
+
+def normalize_event(data):
+    """Shared by both endpoints: merge JSON blobs hiding in fields, then tidy them."""
+    # if fields themselves contain a JSON blob, parse it
+    for k in list(data.keys()):
+        parsed = try_parse_json_field(data.get(k))
+        if isinstance(parsed, dict):
+            # merge parsed keys (source/type/app/note) into data
+            for kk, vv in parsed.items():
+                data.setdefault(kk, vv)
+
+    source = str(data.get("source", "unknown")).lower().strip()
+    etype  = str(data.get("type", "unknown")).lower().strip()
+    app    = str(data.get("app", "")).lower().strip()
+    note   = str(data.get("note", "")).strip()
+
+    # if an app is present but type looks like unlock -> treat as app_open
+    if app and etype in ("unlock", "unknown", ""):
+        etype = "app_open"
+    return {"source": source, "type": etype, "app": app, "note": note}
 
 @app.api_route("/phone/event", methods=["GET","POST"])
 async def phone_event(req: Request):
@@ -66,38 +196,85 @@ async def phone_event(req: Request):
     for k, v in qs.items():
         if v and k not in data: data[k] = v[0]
 
-    # 2) if fields themselves contain a JSON blob, parse it
-    for k in list(data.keys()):
-        parsed = try_parse_json_field(data.get(k))
-        if isinstance(parsed, dict):
-            # merge parsed keys (source/type/app/note) into data
-            for kk, vv in parsed.items():
-                data.setdefault(kk, vv)
+    # 2) blob rescue + normalize fields
+    ev = normalize_event(data)
 
-    # 3) normalize fields
-    source = str(data.get("source", "unknown")).lower().strip()
-    etype  = str(data.get("type", "unknown")).lower().strip()
-    app    = str(data.get("app", "")).lower().strip()
-    note   = str(data.get("note", "")).strip()
+    # 3) dedupe identical (source, type, app) for a short window
+    now_dt = datetime.now()
+    key = f"{ev['source']}|{ev['type']}|{ev['app']}"
+    row = {"iso_ts": now_dt.isoformat(timespec="seconds"), **ev}
+    if (await dedup.seen_many_async([(key, now_dt.timestamp())]))[0]:
+        return JSONResponse({"ok": True, "skipped": "dedup", "saved": row})
 
-    # if an app is present but type looks like unlock -> treat as app_open
-    if app and etype in ("unlock", "unknown", ""):
-        etype = "app_open"
+    await store.append(row)
+    return JSONResponse({"ok": True, "saved": row})
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl",
+                "application/x-jsonlines")
+
+def parse_batch(body, content_type):
+    """JSON array (or {"events": [...]}) or NDJSON, picked by content type, sniffed otherwise."""
+    ctype = content_type.split(";")[0].strip().lower()
+    text = body.strip()
+    if ctype in NDJSON_TYPES or (ctype != "application/json" and not text.startswith(b"[")):
+        items = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line: continue
+            try:
+                items.append(json_loads(line))
+            except ValueError:
+                items.append(None)   # counted as invalid, the rest still go in
+        return items
+    obj = json_loads(text) if text else []
+    if isinstance(obj, dict):
+        obj = obj.get("events", [obj])
+    return obj if isinstance(obj, list) else []
+
+def event_time(data, fallback):
+    """Client-side timestamp of a buffered event (iso_ts/ts, ISO or unix), else `fallback`."""
+    v = data.get("iso_ts", data.get("ts"))
+    try:
+        if isinstance(v, (int, float)):
+            return datetime.fromtimestamp(v / 1000.0 if v > 1e11 else v)
+        if isinstance(v, str) and v.strip():
+            dt = datetime.fromisoformat(v.strip().replace("Z", "+00:00"))
+            return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+    except (ValueError, OverflowError, OSError):
+        pass
+    return fallback
+
+@app.post("/phone/events:batch")
+async def phone_events_batch(req: Request):
+    """
+    Upload many events at once (e.g. buffered while offline). Each event keeps
+    its own iso_ts/ts if it has one; the batch is normalized, deduped in time
+    order and written with a single append.
+    """
+    try:
+        items = parse_batch(await req.body(), req.headers.get("content-type", ""))
+    except ValueError:
+        return JSONResponse({"ok": False, "error": "body is not JSON or NDJSON"}, status_code=400)
 
-    # 4) dedupe identical (source, type, app) for a short window
     now_dt = datetime.now()
-    key = f"{source}|{etype}|{app}"
-    now_unix = time.time()
-    last = _last_seen.get(key, 0.0)
-    if now_unix - last < DEDUP_SECONDS:
-        return JSONResponse({"ok": True, "skipped": "dedup", "saved": {
-            "iso_ts": now_dt.isoformat(timespec="seconds"),
-            "source": source, "type": etype, "app": app, "note": note
-        }})
-
-    _last_seen[key] = now_unix
-
-    row = {"iso_ts": now_dt.isoformat(timespec="seconds"),
-           "source": source, "type": etype, "app": app, "note": note}
-    append_event(row)
-    return JSONResponse({"ok": True, "saved": row})
+    timed, invalid = [], 0
+    for data in items:
+        if not isinstance(data, dict):
+            invalid += 1
+            continue
+        # client clocks are not trusted into the future: that would flush the dedup
+        # window and make the row "newest" for the index and every viewer
+        timed.append((min(event_time(data, now_dt), now_dt), normalize_event(data)))
+    timed.sort(key=lambda te: te[0])
+
+    dup = await dedup.seen_many_async([(f"{ev['source']}|{ev['type']}|{ev['app']}", t.timestamp())
+                                       for t, ev in timed])
+    rows, skipped = [], 0
+    for (t, ev), is_dup in zip(timed, dup):
+        if is_dup:
+            skipped += 1
+            continue
+        rows.append({"iso_ts": t.isoformat(timespec="seconds"), **ev})
+    await store.append_many(rows)
+    return JSONResponse({"ok": True, "received": len(items), "saved": len(rows),
+                         "skipped": skipped, "invalid": invalid})
@@ -0,0 +1,109 @@
+import http.client, json, sys, threading, time
+import urllib.parse, urllib.request
+from collections import deque
+
+# Subscriber for the server's /phone/stream (server-sent events), stdlib only so
+# viewers such as live_plot.py need nothing extra:
+#
+#   feed = EventFeed("http://localhost:8000/phone/stream").start()
+#   rows = feed.snapshot()      # latest events, oldest first
+#
+#   python stream_client.py [URL]    # print events as they arrive
+
+RECONNECT_S = 2.0
+
+class EventFeed:
+    """
+    Background thread that keeps the last `maxlen` pushed events in memory.
+    On (re)connect it asks for everything since the newest event it already
+    has, skipping the ones it has seen, so a server restart leaves no holes.
+    `version` increases with every new event; poll it to know when to redraw.
+    """
+    def __init__(self, url, since=None, maxlen=1000, timeout=30.0):
+        self.url = url
+        self.since = since
+        self.rows = deque(maxlen=maxlen)
+        self.timeout = timeout   # > the server's keepalive interval
+        self.lock = threading.Lock()
+        self.version = 0
+        self.newest = None       # largest iso_ts received
+        self.connected = False
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="event-feed", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.stop.set()
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.rows)
+
+    def poll(self, seen):
+        """(version, events added since `seen` that are still buffered)."""
+        with self.lock:
+            n = min(self.version - seen, len(self.rows))
+            return self.version, list(self.rows)[len(self.rows) - n:] if n > 0 else []
+
+    def _add(self, row):
+        with self.lock:
+            ts = str(row.get("iso_ts", ""))
+            if self.newest is not None and ts <= self.newest:
+                # replayed on reconnect (or back-dated): keep only if unseen
+                if row in self.rows:
+                    return
+            else:
+                self.newest = ts
+            self.rows.append(row)
+            self.version += 1
+
+    def _open(self):
+        with self.lock:
+            since = self.newest or self.since
+        url = self.url
+        if since:
+            sep = "&" if "?" in url else "?"
+            url += sep + urllib.parse.urlencode({"since": since})
+        req = urllib.request.Request(url, headers={"Accept": "text/event-stream"})
+        return urllib.request.urlopen(req, timeout=self.timeout)
+
+    def _run(self):
+        while not self.stop.is_set():
+            try:
+                with self._open() as resp:
+                    self.connected = True
+                    data = []
+                    for raw in resp:
+                        if self.stop.is_set():
+                            return
+                        line = raw.decode("utf-8").rstrip("\r\n")
+                        if line.startswith("data:"):
+                            data.append(line[5:].lstrip())
+                        elif not line and data:
+                            try:
+                                row = json.loads("\n".join(data))
+                            except ValueError:
+                                row = None
+                            if isinstance(row, dict):
+                                self._add(row)
+                            data = []
+            except (OSError, http.client.HTTPException, ValueError):
+                pass   # server down / restarting / dropped mid-chunk / bad payload: retry below
+            finally:
+                self.connected = False
+            self.stop.wait(RECONNECT_S)
+
+if __name__ == "__main__":
+    feed = EventFeed(sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000/phone/stream").start()
+    seen = 0
+    try:
+        while True:
+            time.sleep(0.05)
+            seen, rows = feed.poll(seen)
+            for r in rows:
+                print(r)
+    except KeyboardInterrupt:
+        feed.close()
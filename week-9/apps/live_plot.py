@@ -3,7 +3,7 @@
 # Panels: Heat Index (°C), Temp & Humidity, Fidget (+ occupied shading), PIR, Phone Events
 # Phone Events panel: distinct markers per app, circles for plain unlock (no app).
 
-import sys
+import io, os, sys
 from pathlib import Path
 from datetime import datetime, timedelta
 
@@ -11,9 +11,15 @@ import numpy as np
 import pandas as pd
 import matplotlib
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 import matplotlib.dates as mdates
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "analysis"))
+from plot_utils import IntervalShade, BlitManager, MinMaxPyramid
+from events_dedup import EventDeduper
+from timejoin import window
+sys.path.insert(0, str(Path(__file__).resolve().parent / "api"))
+from stream_client import EventFeed
+
 # If you don't see a window, uncomment one:
 # matplotlib.use("MacOSX")  # macOS native
 # matplotlib.use("TkAgg")   # cross-platform
@@ -30,6 +36,22 @@ print("[LivePlot] DATA_DIR =", DATA_DIR, "exists:", DATA_DIR.exists())
 TAIL_ROWS  = 1200      # ~5 minutes at ~4 Hz
 REFRESH_MS = 1000      # redraw every 1s
 
+# Time range on screen; press 1 / 2 / 3 in the window to switch. Wider ranges
+# are drawn from min/max summaries, decimated to the panel's pixel width; the
+# file is only read back as far as the widest range chosen so far (the whole
+# of it once "day" is picked). Start with e.g. LIVE_RANGE=1h (5min, 1h, day).
+RANGES = {"1": ("5min", 300), "2": ("1h", 3600), "3": ("day", None)}
+RANGE_NAME = os.getenv("LIVE_RANGE", "5min")
+RANGE_S = dict(RANGES.values()).get(RANGE_NAME, 300)
+SAMPLE_HZ = 4          # rows per second, to size the read-back of a range
+HISTORY_COLS = ["heat_index_c", "temp_c", "hum_pct", "fidget", "pir_raw", "occupied"]
+
+# Phone events pushed by the API server instead of re-reading events.csv, e.g.
+#   EVENTS_STREAM=http://localhost:8000/phone/stream python apps/live_plot.py
+# New markers are drawn within EVENT_POLL_MS of the server accepting them.
+EVENTS_STREAM = os.getenv("EVENTS_STREAM", "")
+EVENT_POLL_MS = 50
+
 # App marker preferences (you can change these)
 APP_MARKERS_PREF = {
     "instagram": "^",   # triangle_up
@@ -51,75 +73,253 @@ def latest_csv():
     files = sorted(files)
     return files[-1] if files else None
 
+FLAG_COLS  = ["occupied","focused","pir_raw","motion"]
+VALUE_COLS = ["heat_index_c","fidget","temp_c","hum_pct","ms"]
+TAIL_BACKFILL = 256 * 1024   # bytes read backwards per step when (re)opening a big file
+
+class TailReader:
+    """
+    Follows the newest daily CSV without re-reading it: remembers the byte
+    offset, parses only complete lines appended since the last call, and keeps
+    the last `capacity` rows per column in fixed NumPy ring buffers. On open it
+    seeks back from the end just far enough for `capacity` rows, so each frame
+    costs the same whether the file holds 1k or 1M rows. A new file (day
+    rotation, CLI override) or a truncated one starts over.
+
+    With `history` (a MinMaxPyramid) every row is also appended there, for the
+    wider time ranges; on open the file is read back `history_rows` rows (None:
+    all of it). reach_back() widens that, at the cost of one reopen.
+    """
+    def __init__(self, capacity=TAIL_ROWS, history=None, history_rows=TAIL_ROWS):
+        self.capacity = capacity
+        self.history = history
+        self.history_rows = history_rows
+        self.path = None
+        self.cols = {c: np.full(capacity, np.nan) for c in FLAG_COLS + VALUE_COLS}
+        self.t = np.full(capacity, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self._reset(None)
+
+    def _reset(self, path):
+        self.path = path
+        self.offset = 0
+        self.header = None
+        self.rest = b""
+        self.n = 0      # rows held (<= capacity)
+        self.head = 0   # next write slot
+        self.total = 0  # rows seen since open (for the no-timestamp fallback)
+        if self.history is not None:
+            self.history.clear()
+
+    def _open_tail(self, f, size):
+        """Header line + the byte offset where the last `capacity` rows start."""
+        f.seek(0)
+        header = f.readline()
+        if not header.endswith(b"\n"):
+            return None, 0
+        start = len(header)
+        rows = self.capacity
+        if self.history is not None:
+            if self.history_rows is None:
+                return header.decode("utf-8", "replace").strip().split(","), start
+            rows = max(rows, self.history_rows)
+        pos = size
+        buf = b""
+        while pos > start and buf.count(b"\n") <= rows:
+            step = min(TAIL_BACKFILL, pos - start)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+        if pos > start:
+            # land on a line boundary, keeping `rows` full lines
+            cut = len(buf)
+            for _ in range(rows + 1):
+                cut = buf.rfind(b"\n", 0, cut)
+            pos += cut + 1
+        return header.decode("utf-8", "replace").strip().split(","), pos
+
+    def _push(self, chunk):
+        df = pd.read_csv(io.StringIO(chunk), names=self.header, header=None,
+                         on_bad_lines="skip", dtype=str)
+        k = len(df)
+        if k == 0:
+            return
+        vals = {c: pd.to_numeric(df[c], errors="coerce").to_numpy(float, copy=True) if c in df.columns
+                else np.full(k, np.nan) for c in self.cols}
+        vals["heat_index_c"][vals["heat_index_c"] <= -100] = np.nan
+        if "iso_ts" in df.columns:
+            t = pd.to_datetime(df["iso_ts"], errors="coerce")
+        elif "ms" in df.columns:
+            t = pd.to_datetime(vals["ms"] / 1000.0, unit="s")
+        else:
+            t = pd.to_datetime((self.total + np.arange(k)) * 0.25, unit="s")
+        t = np.asarray(t, dtype="datetime64[ns]")
+        if self.history is not None:
+            self._push_history(t, vals)
+        if k > self.capacity:
+            t = t[-self.capacity:]
+            vals = {c: v[-self.capacity:] for c, v in vals.items()}
+        idx = (self.head + np.arange(len(t))) % self.capacity
+        for c, buf in self.cols.items():
+            buf[idx] = vals[c]
+        self.t[idx] = t
+        self.head = (self.head + len(t)) % self.capacity
+        self.n = min(self.capacity, self.n + len(t))
+        self.total += k
+
+    def _push_history(self, t, vals):
+        h = self.history
+        x = mdates.date2num(t)
+        # the summaries need ascending time: drop NaT and anything older than what came before
+        prev = h.t[h.n - 1] if h.n else -np.inf
+        keep = np.isfinite(x) & (x >= np.fmax.accumulate(np.concatenate(([prev], x)))[:-1])
+        h.extend(x[keep], {c: vals[c][keep] for c in h.columns})
+
+    def reach_back(self, rows):
+        """Have the history start `rows` rows back (None: the file's first row) from the next poll on."""
+        if self.history is None or self.history_rows is None:
+            return
+        if rows is None or rows > self.history_rows:
+            self.history_rows = rows
+            self.path = None   # reopen on the next poll
+
+    def poll(self, path):
+        """Parse whatever was appended to `path` since the last call."""
+        size = os.path.getsize(path)
+        if path != self.path or size < self.offset:
+            self._reset(path)
+        if size == self.offset:
+            return
+        with open(path, "rb") as f:
+            if self.header is None:
+                self.header, self.offset = self._open_tail(f, size)
+                if self.header is None:
+                    return
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset = size
+        data = self.rest + data
+        end = data.rfind(b"\n") + 1   # only complete lines; keep the rest for next time
+        self.rest = data[end:]
+        if end:
+            self._push(data[:end].decode("utf-8", "replace"))
+
+    def frame(self):
+        """The buffered rows, oldest first, as the DataFrame update() expects."""
+        order = (self.head - self.n + np.arange(self.n)) % self.capacity
+        df = pd.DataFrame({c: buf[order] for c, buf in self.cols.items()})
+        for c in FLAG_COLS:
+            df[c] = df[c].fillna(0).astype(int)
+        df["t"] = self.t[order]
+        return df
+
+def range_rows(seconds):
+    """Rows the history must reach back for a range of `seconds` (None: the whole file)."""
+    return None if seconds is None else max(TAIL_ROWS, int(seconds * SAMPLE_HZ))
+
+history = MinMaxPyramid(HISTORY_COLS)
+tail = TailReader(history=history, history_rows=range_rows(RANGE_S))
+
 def load_df():
     p = latest_csv()
     if not p or not p.exists():
         return pd.DataFrame(), None
-    df = pd.read_csv(p, on_bad_lines="skip", engine="python")
-
-    # coerce types
-    for c in ["occupied","focused","pir_raw","motion"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype(int)
-    for c in ["heat_index_c","fidget","temp_c","hum_pct","ms"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-
-    if "heat_index_c" in df.columns:
-        df.loc[df["heat_index_c"] <= -100, "heat_index_c"] = np.nan
-
-    # time axis
-    if "iso_ts" in df.columns:
-        df["t"] = pd.to_datetime(df["iso_ts"], errors="coerce")
-    elif "ms" in df.columns:
-        df["t"] = pd.to_datetime(df["ms"]/1000.0, unit="s")
-    else:
-        df["t"] = pd.to_datetime(np.arange(len(df))*0.25, unit="s")
+    tail.poll(p)
+    if tail.n == 0:
+        return pd.DataFrame(), None
+    return tail.frame(), p.name
 
-    if len(df) > TAIL_ROWS:
-        df = df.tail(TAIL_ROWS).copy()
+feed = EventFeed(EVENTS_STREAM, since=datetime.now().strftime("%Y-%m-%d")).start() if EVENTS_STREAM else None
 
-    return df, p.name
+EVENTS_MAX = 1000
+EVENT_FIELDS = ["iso_ts", "source", "type", "app", "note"]
 
-def load_events_live():
+class EventsTail:
     """
-    Read events directly (no preprocessing). Minimal normalization in-memory.
-    Returns columns: t, app  (type is always 'unlock' by your design; app optional)
+    Phone events for the events panel, read incrementally: new lines of
+    events.csv since the last byte offset, or new rows from the push feed.
+    Only those rows are normalised and run through the streaming 10 s
+    same-app dedup; the last EVENTS_MAX kept events are held. A back-dated
+    row (batch upload) or a replaced file triggers one full re-read so the
+    dedup still sees events in time order.
     """
-    path = EVENTS_RAW if EVENTS_RAW.exists() else EVENTS_CLEAN
-    if not path.exists():
-        return pd.DataFrame(columns=["t","app"])
-    try:
-        ev = pd.read_csv(path, on_bad_lines="skip", engine="python")
-    except Exception:
-        return pd.DataFrame(columns=["t","app"])
-
-    if "iso_ts" not in ev.columns:
-        return pd.DataFrame(columns=["t","app"])
-
-    ev["t"] = pd.to_datetime(ev["iso_ts"], errors="coerce")
-    ev = ev.dropna(subset=["t"]).sort_values("t")
+    def __init__(self):
+        self.dedup = EventDeduper(["app"])
+        self._reset(None)
+
+    def _reset(self, path):
+        self.path = path
+        self.offset = 0
+        self.header = None
+        self.rest = b""
+        self.seen = 0
+        self.dedup.reset()
+        self.ev = pd.DataFrame({"t": pd.Series(dtype="datetime64[ns]"), "app": pd.Series(dtype=object)})
+
+    def _read_new(self):
+        if feed is not None:
+            self.seen, rows = feed.poll(self.seen)
+            return pd.DataFrame(rows, columns=EVENT_FIELDS)
+        path = EVENTS_RAW if EVENTS_RAW.exists() else EVENTS_CLEAN
+        if not path.exists():
+            self._reset(None)
+            return None
+        size = path.stat().st_size
+        if path != self.path or size < self.offset:
+            self._reset(path)
+        if size == self.offset:
+            return None
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            data = self.rest + f.read(size - self.offset)
+        self.offset = size
+        end = data.rfind(b"\n") + 1   # complete lines only
+        self.rest = data[end:]
+        text = data[:end].decode("utf-8", "replace")
+        if self.header is None:
+            head, _, text = text.partition("\n")
+            self.header = head.strip().split(",")
+        if not text:
+            return None
+        try:
+            return pd.read_csv(io.StringIO(text), names=self.header, header=None,
+                               on_bad_lines="skip", engine="python")
+        except Exception:
+            return None
+
+    def load(self):
+        """
+        Minimal normalization in-memory.
+        Returns columns: t, app  (type is always 'unlock' by your design; app optional)
+        """
+        new = self._read_new()
+        if new is None or new.empty or "iso_ts" not in new.columns:
+            return self.ev
+        new["t"] = pd.to_datetime(new["iso_ts"], errors="coerce")
+        new = new.dropna(subset=["t"]).sort_values("t", kind="stable")
+        if new.empty:
+            return self.ev
+
+        # normalize app field
+        if "app" in new.columns:
+            new["app"] = new["app"].fillna("").astype(str).str.strip().str.lower()
+        else:
+            new["app"] = ""
+
+        if self.dedup.last is not None and new["t"].iloc[0] < self.dedup.last[1]:
+            # out of order: start over from the whole file / feed buffer
+            self._reset(self.path)
+            return self.load()
+
+        # soft de-dup within 10s for same app/empty-app
+        kept = self.dedup.filter(new[["t", "app"]])
+        self.ev = pd.concat([self.ev, kept], ignore_index=True).tail(EVENTS_MAX).reset_index(drop=True)
+        return self.ev
+
+events_tail = EventsTail()
 
-    # normalize app field
-    if "app" in ev.columns:
-        ev["app"] = ev["app"].fillna("").astype(str).str.strip().str.lower()
-    else:
-        ev["app"] = ""
-
-    # soft de-dup within 10s for same app/empty-app
-    if len(ev) >= 2:
-        ev = ev.reset_index(drop=True)
-        keep = [True]
-        for i in range(1, len(ev)):
-            same = (ev.loc[i,"app"] == ev.loc[i-1,"app"])
-            gap  = (ev.loc[i,"t"] - ev.loc[i-1,"t"]).total_seconds()
-            keep.append(not (same and gap < 10))
-        ev = ev[pd.Series(keep).values]
-
-    # limit to last 1000
-    if len(ev) > 1000:
-        ev = ev.tail(1000)
-    return ev[["t","app"]]
+def load_events_live():
+    """Events for the panel (t, app); with EVENTS_STREAM set they come from the push feed, with no file I/O."""
+    return events_tail.load()
 
 # ---------- plotting setup ----------
 plt.rcParams["figure.figsize"] = (12, 12)
@@ -185,10 +385,12 @@ def ensure_artist(app: str):
     marker = get_marker_for_app(app)
     label = "unlock" if app == "" else app
     # create an empty scatter; we'll set offsets later
+    global _layout_dirty
     art = ax_evt.scatter([], [], s=(26 if app else 18), marker=marker, alpha=0.9 if app else 0.7, label=label)
-    APP_ARTISTS[app] = art
-    # refresh legend to include the new artist
+    APP_ARTISTS[app] = blit.add(art)
+    # refresh legend to include the new artist (legend is static: full redraw)
     ax_evt.legend(loc="upper right", frameon=False)
+    _layout_dirty = True
     return art
 
 # Title + file label
@@ -200,143 +402,164 @@ xfmt = mdates.DateFormatter("%H:%M:%S")
 ax_evt.xaxis.set_major_formatter(xfmt)
 fig.autofmt_xdate()
 
-# occupied shading on the fidget axis
-_occ_patches = []
-def clear_occ_patches():
-    global _occ_patches
-    for p in _occ_patches:
-        try: p.remove()
-        except Exception: pass
-    _occ_patches = []
-
-def add_occ_shading(ax, t, occ):
-    """Shade intervals where occupied==1."""
-    if t is None or occ is None or len(t) < 2:
-        return
-    start = None
-    for i in range(len(occ)):
-        if occ[i] == 1 and start is None:
-            start = i
-        if (occ[i] == 0 and start is not None) or (i == len(occ) - 1 and start is not None):
-            end = i if occ[i] == 0 else i
-            _occ_patches.append(ax.axvspan(t[start], t[end], color="lightblue", alpha=0.08))
-            start = None
-
-def update(_):
+# sensor time window shown on screen (events outside it are not drawn)
+_window = (pd.Timestamp.min, pd.Timestamp.max)
+_feed_seen = 0
+
+# occupied shading on the fidget axis: one collection, updated in place
+occ_shade = IntervalShade(ax_fid)
+
+# Everything that changes per frame is blitted over a cached background; only
+# limit/tick/legend changes pay for a full redraw. Limits are sticky (x pages
+# ahead by X_HEADROOM of the window, y only refits when data leaves the range
+# or shrinks well inside it), so most frames are blits.
+X_HEADROOM = 0.1
+blit = BlitManager(fig.canvas, [hi_line, temp_line, hum_line, fid_line, pir_raw_line,
+                                occupied_line, occ_shade.coll, title_txt, file_lbl])
+_layout_dirty = True
+
+def fit_ylim(ax, lo, hi):
+    """Set (lo, hi) unless the current range still holds it and is < 3x its size."""
+    cur_lo, cur_hi = ax.get_ylim()
+    if cur_lo <= lo and hi <= cur_hi and (cur_hi - cur_lo) < 3 * (hi - lo):
+        return False
+    ax.set_ylim(lo, hi)
+    return True
+
+def fit_xlim(x0, x1):
+    cur_lo, cur_hi = ax_evt.get_xlim()
+    if _layout_dirty:
+        cur_lo = cur_hi = np.nan   # range switched: always refit
+    if cur_lo <= x0 and x1 <= cur_hi and x0 - cur_lo < 0.5 * (x1 - x0):
+        return False
+    width = max(x1 - x0, 1e-9)
+    ax_evt.set_xlim(x0, x1 + X_HEADROOM * width)   # sharex: moves every panel
+    return True
+
+def draw_events(now):
+    """Realtime phone events panel with per-app markers; returns (kpi text, last60, last300)."""
+    ev = load_events_live()
+    # compute KPIs regardless (last 60s & 5min by wall-clock)
+    last60 = last300 = 0
+    last_app = ""
+    last_text = "–"
+    if not ev.empty:
+        # update KPIs; ev is time-sorted, so every cut is a binary search
+        t_ns = ev["t"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        last60  = len(ev) - window(t_ns, now - timedelta(seconds=60), now).start
+        last300 = len(ev) - window(t_ns, now - timedelta(seconds=300), now).start
+        if len(ev) > 0:
+            last_dt = ev["t"].iloc[-1]
+            last_app = ev["app"].iloc[-1]
+            last_text = last_dt.strftime("%H:%M:%S")
+
+        # only show events inside current sensor window
+        t0, t1 = _window
+        evw = ev.iloc[window(t_ns, t0, t1)]
+
+        # group by 'app' ("" for plain unlock)
+        for app_name, df_app in evw.groupby("app", dropna=False):
+            artist = ensure_artist(app_name)
+            if df_app.empty:
+                artist.set_offsets(np.empty((0,2)))
+                continue
+            xs = mdates.date2num(df_app["t"])
+            ys = np.zeros_like(xs)  # y=0 line
+            artist.set_offsets(np.column_stack([xs, ys]))
+
+        # also ensure we render artists with no events in window as empty
+        for app_name, artist in list(APP_ARTISTS.items()):
+            if app_name not in evw["app"].unique():
+                artist.set_offsets(np.empty((0,2)))
+    else:
+        # no events at all yet
+        for artist in APP_ARTISTS.values():
+            artist.set_offsets(np.empty((0,2)))
+
+    # labels / KPIs
+    kpi = f"Last 60s: {last60}   •   Last 5min: {last300}   •   Last event: {last_text}"
+    if last_app:
+        kpi += f" ({last_app})"
+    return kpi, last60, last300
+
+def update(_=None):
+    global _window, _feed_seen, _layout_dirty
     df, fname = load_df()
     now = datetime.now()
     now_str = now.strftime("%H:%M:%S")
 
-    if df.empty:
+    if df.empty or history.n == 0:
         title_txt.set_text(f"FocusAir — Live   •   Last update {now_str}")
         file_lbl.set_text("No data found in data/*.csv")
         # clear lines
         for ln in [hi_line, temp_line, hum_line, fid_line, pir_raw_line, occupied_line]:
             ln.set_data([], [])
+        occ_shade.update([], [])
         # clear all event artists
         for art in APP_ARTISTS.values():
             art.set_offsets(np.empty((0,2)))
-        fig.canvas.draw_idle()
-        return tuple([hi_line, temp_line, hum_line, fid_line, pir_raw_line, occupied_line] + list(APP_ARTISTS.values()))
-
-    # x/y data for sensors
-    t_dt = df["t"]
-    t = mdates.date2num(t_dt)
-    hi = df.get("heat_index_c", pd.Series([np.nan]*len(df))).to_numpy()
-    tc = df.get("temp_c",      pd.Series([np.nan]*len(df))).to_numpy()
-    rh = df.get("hum_pct",     pd.Series([np.nan]*len(df))).to_numpy()
-    fid = df.get("fidget",     pd.Series([np.nan]*len(df))).to_numpy()
-    pir_raw  = df.get("pir_raw",  pd.Series([0]*len(df))).to_numpy()
-    occupied = df.get("occupied", pd.Series([0]*len(df))).to_numpy()
+        blit.update(full=_layout_dirty)
+        _layout_dirty = False
+        return
+
+    # visible time range, then each line decimated to the panel's pixel width
+    t1 = history.t[history.n - 1]
+    t0 = history.t[0] if RANGE_S is None else max(history.t[0], t1 - RANGE_S / 86400.0)
+    px = ax_hi.bbox.width
+    xy = {c: history.decimate(c, t0, t1, px) for c in HISTORY_COLS}
+    hi, tc, rh, fid = (xy[c][1] for c in ["heat_index_c", "temp_c", "hum_pct", "fidget"])
+    occupied = df["occupied"].to_numpy()
 
     # lines
-    hi_line.set_data(t, hi)
-    temp_line.set_data(t, tc)
-    hum_line.set_data(t, rh)
-    fid_line.set_data(t, fid)
-    pir_raw_line.set_data(t, pir_raw)
-    occupied_line.set_data(t, occupied)
+    hi_line.set_data(*xy["heat_index_c"])
+    temp_line.set_data(*xy["temp_c"])
+    hum_line.set_data(*xy["hum_pct"])
+    fid_line.set_data(*xy["fidget"])
+    pir_raw_line.set_data(*xy["pir_raw"])
+    occupied_line.set_data(*xy["occupied"])
 
     # y-lims
+    changed = _layout_dirty
     if np.isfinite(hi).any():
         ymin = np.nanmin(hi); ymax = np.nanmax(hi)
         if np.isfinite(ymin) and np.isfinite(ymax):
             pad = max(0.5, (ymax - ymin) * 0.2) if ymax > ymin else 1.0
-            ax_hi.set_ylim(ymin - pad*0.2, ymax + pad*0.2)
-    ax_hi.relim(); ax_hi.autoscale_view(scalex=True, scaley=False)
+            changed |= fit_ylim(ax_hi, ymin - pad*0.2, ymax + pad*0.2)
 
     if np.isfinite(tc).any():
         tmin = np.nanmin(tc); tmax = np.nanmax(tc)
         if np.isfinite(tmin) and np.isfinite(tmax):
             pad = (tmax - tmin) * 0.2 if tmax > tmin else 1.0
-            ax_th.set_ylim(tmin - pad*0.1, tmax + pad*0.1)
+            changed |= fit_ylim(ax_th, tmin - pad*0.1, tmax + pad*0.1)
     if np.isfinite(rh).any():
         rmin = max(0.0, np.nanmin(rh)); rmax = min(100.0, np.nanmax(rh))
-        ax_th2.set_ylim(max(0.0, rmin - 5), min(100.0, rmax + 5))
+        changed |= fit_ylim(ax_th2, max(0.0, rmin - 5), min(100.0, rmax + 5))
 
     if np.isfinite(fid).any():
         fmin = np.nanmin(fid); fmax = np.nanmax(fid)
         if np.isfinite(fmin) and np.isfinite(fmax):
             pad = (fmax - fmin) * 0.2 if fmax > fmin else 0.1
-            ax_fid.set_ylim(fmin - pad, fmax + pad)
-    ax_fid.relim(); ax_fid.autoscale_view(scalex=True, scaley=False)
+            changed |= fit_ylim(ax_fid, fmin - pad, fmax + pad)
 
     # x-lims
-    if len(t) >= 2:
-        x0, x1 = t[0], t[-1]
-        for ax in (ax_hi, ax_th, ax_fid, ax_pir, ax_evt):
-            ax.set_xlim(x0, x1)
+    if t1 > t0:
+        changed |= fit_xlim(t0, t1)
 
-    # occupied shading
-    clear_occ_patches()
-    add_occ_shading(ax_fid, t_dt.to_numpy(), occupied)
+    # occupied shading (raw samples: intervals are cheap even for a whole day)
+    i0, i1 = np.searchsorted(history.t[:history.n], [t0, t1 + 1e-9])
+    occ_shade.update(history.t[i0:i1], history.y["occupied"][i0:i1], min_gap=(t1 - t0) / px)
 
     # ---- realtime phone events panel with per-app markers ----
-    ev = load_events_live()
-    # compute KPIs regardless (last 60s & 5min by wall-clock)
-    last60 = last300 = 0
-    last_app = ""
-    last_text = "–"
-    if not ev.empty:
-        # update KPIs
-        last60_start  = now - timedelta(seconds=60)
-        last300_start = now - timedelta(seconds=300)
-        last60  = (ev["t"] >= last60_start).sum()
-        last300 = (ev["t"] >= last300_start).sum()
-        if len(ev) > 0:
-            last_dt = ev["t"].iloc[-1]
-            last_app = ev["app"].iloc[-1]
-            last_text = last_dt.strftime("%H:%M:%S")
-
-        # only show events inside current sensor window
-        t0, t1 = t_dt.iloc[0], t_dt.iloc[-1]
-        evw = ev[(ev["t"] >= t0) & (ev["t"] <= t1)].copy()
-
-        # group by 'app' ("" for plain unlock)
-        for app_name, df_app in evw.groupby("app", dropna=False):
-            artist = ensure_artist(app_name)
-            if df_app.empty:
-                artist.set_offsets(np.empty((0,2)))
-                continue
-            xs = mdates.date2num(df_app["t"])
-            ys = np.zeros_like(xs)  # y=0 line
-            artist.set_offsets(np.column_stack([xs, ys]))
-
-        # also ensure we render artists with no events in window as empty
-        for app_name, artist in list(APP_ARTISTS.items()):
-            if app_name not in evw["app"].unique():
-                artist.set_offsets(np.empty((0,2)))
-    else:
-        # no events at all yet
-        for artist in APP_ARTISTS.values():
-            artist.set_offsets(np.empty((0,2)))
-
-    # labels / KPIs
-    kpi = f"Last 60s: {last60}   •   Last 5min: {last300}   •   Last event: {last_text}"
-    if last_app:
-        kpi += f" ({last_app})"
+    _window = tuple(pd.Timestamp(mdates.num2date(x)).tz_localize(None) for x in (t0, t1))
+    if feed is not None:
+        _feed_seen = feed.version
+    kpi, last60, last300 = draw_events(now)
     title_txt.set_text(f"FocusAir — Live   •   {kpi}   •   Updated {now_str}")
-    file_lbl.set_text(f"Reading: {fname}   |   rows: {len(df)}")
+    npts = len(xy["heat_index_c"][0])
+    file_lbl.set_text(f"Reading: {fname}   |   range: {RANGE_NAME} ({i1 - i0} rows, {npts} drawn)   |   keys 1/2/3: 5min/1h/day")
+
+    blit.update(full=changed or _layout_dirty)
+    _layout_dirty = False
 
     # console heartbeat
     if "ms" in df.columns and df["ms"].notna().sum() > 1:
@@ -347,9 +570,34 @@ def update(_):
     occ_minutes = (occupied.sum() * dt) / 60.0
     print(f"[LivePlot] {fname} rows={len(df)}  occupied≈{occ_minutes:.2f} min  events60={last60}  events5m={last300}")
 
-    # return all artists so FuncAnimation can manage redraws
-    return tuple([hi_line, temp_line, hum_line, fid_line, pir_raw_line, occupied_line] + list(APP_ARTISTS.values()))
-
-ani = FuncAnimation(fig, update, interval=REFRESH_MS, blit=False, cache_frame_data=False)
+def poll_feed():
+    """Redraw just the events panel as soon as the feed has something new."""
+    global _feed_seen, _layout_dirty
+    if feed.version == _feed_seen:
+        return
+    _feed_seen = feed.version
+    now = datetime.now()
+    kpi, _, _ = draw_events(now)
+    title_txt.set_text(f"FocusAir — Live   •   {kpi}   •   Updated {now.strftime('%H:%M:%S')}")
+    blit.update(full=_layout_dirty)
+    _layout_dirty = False
+
+def on_key(event):
+    global RANGE_NAME, RANGE_S, _layout_dirty
+    if event.key in RANGES:
+        RANGE_NAME, RANGE_S = RANGES[event.key]
+        tail.reach_back(range_rows(RANGE_S))
+        _layout_dirty = True
+        update()
+
+fig.canvas.mpl_connect("key_press_event", on_key)
+
+frame_timer = fig.canvas.new_timer(interval=REFRESH_MS)
+frame_timer.add_callback(update)
+frame_timer.start()
+if feed is not None:
+    feed_timer = fig.canvas.new_timer(interval=EVENT_POLL_MS)
+    feed_timer.add_callback(poll_feed)
+    feed_timer.start()
 plt.tight_layout()
 plt.show()
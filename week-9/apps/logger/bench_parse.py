@@ -0,0 +1,34 @@
+import json, random, sys, time
+from logger import DeviceClock, parse_line
+
+# usage: python bench_parse.py [N]   parse throughput (lines/sec), CSV and JSON paths
+N = 200_000
+
+def make_lines(n):
+    rng = random.Random(225)
+    csv_lines, json_lines = [], []
+    for i in range(n):
+        ms = 24_948_318 + i * 250
+        t = round(24 + rng.random() * 4, 2)
+        vals = dict(ms=ms, temp_c=t, hum_pct=round(55 + rng.random() * 5, 1), heat_index_c=t,
+                    pir_raw=rng.randint(0, 1), motion=0, occupied=1,
+                    fidget=round(rng.random() * 0.01, 4), focused=1)
+        csv_lines.append(",".join(str(v) for v in vals.values()) + "\r\n")
+        json_lines.append(json.dumps(vals) + "\r\n")
+    return csv_lines, json_lines
+
+def rate(lines, clock):
+    t0 = time.perf_counter()
+    for line in lines:
+        parse_line(line, clock)
+    return len(lines) / (time.perf_counter() - t0)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N
+    csv_lines, json_lines = make_lines(n)
+    for name, lines in (("csv", csv_lines), ("json", json_lines)):
+        print(f"{name:>4}: device clock {rate(lines, DeviceClock()):>10,.0f} lines/s"
+              f"   wall clock per line {rate(lines, None):>10,.0f} lines/s")
+
+if __name__ == "__main__":
+    main()
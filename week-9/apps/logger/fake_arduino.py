@@ -0,0 +1,72 @@
+import os, sys, time, math, random, signal, tty
+
+# Stand-in for one or more FocusAir boards: opens pseudo-terminal pairs and
+# streams firmware-style CSV lines into them, so logger.py can be exercised
+# without hardware:
+#
+#   python fake_arduino.py 3 100          # 3 boards at 100 Hz
+#   ALL_PORTS=1 SERIAL_PORT="/tmp/focusair-tty*" python logger.py
+#
+# Lines nobody reads are dropped (like a UART with the port closed).
+
+LINK_DIR = os.getenv("FAKE_DIR", "/tmp")
+LINK_PREFIX = "focusair-tty"
+
+def open_boards(n):
+    boards = []
+    for i in range(n):
+        master, slave = os.openpty()
+        tty.setraw(slave)                # no echo / newline translation
+        os.set_blocking(master, False)
+        link = os.path.join(LINK_DIR, f"{LINK_PREFIX}{i}")
+        if os.path.lexists(link): os.remove(link)
+        os.symlink(os.ttyname(slave), link)
+        boards.append({"master": master, "slave": slave, "link": link, "t0": time.monotonic(),
+                       "rng": random.Random(i)})
+        print(f"[fake] board {i}: {link} -> {os.ttyname(slave)}")
+    return boards
+
+def sample_line(b):
+    ms = int((time.monotonic() - b["t0"]) * 1000)
+    rng = b["rng"]
+    temp = 24.5 + 2.0 * math.sin(ms / 600_000.0) + rng.gauss(0, 0.05)
+    hum = 58.0 + rng.gauss(0, 1.0)
+    pir = int(rng.random() < 0.05)
+    occupied = 1
+    fidget = abs(rng.gauss(0.003, 0.001))
+    focused = int(fidget < 0.015)
+    return f"{ms},{temp:.2f},{hum:.1f},{temp:.2f},{pir},{pir},{occupied},{fidget:.4f},{focused}\n".encode()
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    hz = float(sys.argv[2]) if len(sys.argv) > 2 else 4.0
+    signal.signal(signal.SIGTERM, signal.default_int_handler)   # clean up links on kill too
+    boards = open_boards(n)
+    period = 1.0 / hz
+    sent = dropped = 0
+    next_t = time.monotonic()
+    last_report = next_t
+    try:
+        while True:
+            for b in boards:
+                try:
+                    os.write(b["master"], sample_line(b))
+                    sent += 1
+                except BlockingIOError:
+                    dropped += 1
+            next_t += period
+            now = time.monotonic()
+            if now - last_report >= 5.0:
+                print(f"[fake] sent={sent} dropped={dropped}")
+                last_report = now
+            if next_t > now:
+                time.sleep(next_t - now)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for b in boards:
+            os.close(b["master"]); os.close(b["slave"])
+            if os.path.lexists(b["link"]): os.remove(b["link"])
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,37 @@
-import csv, json, os, sys, datetime, glob
+import csv, json, os, re, sys, datetime, glob, threading, time
 import serial  # pip install pyserial
 from pathlib import Path
 
-
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "analysis"))
+from online_anomalies import OnlineDetector
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 
 PORT = os.getenv("SERIAL_PORT", "/dev/tty.usbmodem21101")  # macOS: wildcard ok
 BAUD = int(os.getenv("BAUD", "115200"))
 OUTDIR = os.getenv("OUTDIR", str(PROJECT_ROOT / "data"))
+# ALL_PORTS=1: open every port matching SERIAL_PORT, one reader thread and one
+# OUTDIR/<device>/ folder per board
+ALL_PORTS = os.getenv("ALL_PORTS", "0") == "1"
+READ_TIMEOUT_S = 0.5
+RECONNECT_S = 2.0
+RESCAN_S = 5.0
+
+# write batching: flush after FLUSH_ROWS rows or FLUSH_S seconds, whichever
+# comes first; fsync at most every FSYNC_S seconds (0 = every flush, <0 = never)
+FLUSH_ROWS = int(os.getenv("FLUSH_ROWS", "64"))
+FLUSH_S = float(os.getenv("FLUSH_S", "1.0"))
+FSYNC_S = float(os.getenv("FSYNC_S", "30"))
+ROTATE_CHECK_S = 1.0   # how often to look at the date for daily rotation
 
 FIELDS = ["iso_ts","ms","temp_c","hum_pct","heat_index_c","pir_raw","motion","occupied","fidget","focused"]
+JSON_FIELDS = [("temp_c", float), ("hum_pct", float), ("heat_index_c", float), ("pir_raw", int),
+               ("motion", int), ("occupied", int), ("fidget", float), ("focused", int)]
+
+# iso_ts is derived from the board's ms counter (see DeviceClock)
+ANCHOR_REFRESH_S = 60.0
+RESYNC_S = 2.0
+SLEW = 0.5
 
 def pick_port(pattern):
     if "*" not in pattern:
@@ -22,67 +43,248 @@ def pick_port(pattern):
     print("Using port:", matches[0])
     return matches[0]
 
-def today_path():
+def device_id(port):
+    # /dev/tty.usbmodem21101 -> usbmodem21101
+    name = os.path.basename(port)
+    for prefix in ("tty.", "cu."):
+        if name.startswith(prefix): name = name[len(prefix):]
+    return re.sub(r"[^A-Za-z0-9_-]", "_", name)
+
+def today_path(device=None):
     d = datetime.date.today().isoformat()
-    os.makedirs(OUTDIR, exist_ok=True)
-    return os.path.join(OUTDIR, f"{d}.csv")
+    outdir = os.path.join(OUTDIR, device) if device else OUTDIR
+    os.makedirs(outdir, exist_ok=True)
+    return os.path.join(outdir, f"{d}.csv")
+
+def anomalies_path(path):
+    # S1/F1 events found while logging, next to the day's CSV
+    return path.replace(".csv", ".anomalies.jsonl")
+
+def recover_tail(path):
+    """Cut a partial last line (crash / power loss mid-write) so appends start clean."""
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        pos, cut = size, 0
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            i = f.read(step).rfind(b"\n")
+            if i >= 0:
+                cut = pos + i + 1
+                break
+        if cut < size:
+            f.truncate(cut)
+            print(f"Recovered {path}: dropped {size - cut} bytes of partial row")
+
+class BatchWriter:
+    """
+    Appends rows to a daily CSV through a userspace buffer, so a 4-100 Hz stream
+    costs one write() per batch instead of one per line. flush()/close() push
+    the batch out; the fsync policy bounds what a power cut can lose.
+    """
+    def __init__(self, path, fields=FIELDS, flush_rows=FLUSH_ROWS, flush_s=FLUSH_S, fsync_s=FSYNC_S):
+        self.path, self.fields = path, fields
+        self.flush_rows, self.flush_s, self.fsync_s = flush_rows, flush_s, fsync_s
+        if os.path.exists(path):
+            recover_tail(path)
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.f = open(path, "a", newline="", buffering=1 << 16)
+        self.w = csv.writer(self.f)
+        if new: self.w.writerow(fields)
+        self.pending = 0
+        self.last_flush = self.last_sync = time.monotonic()
+
+    def write(self, row):
+        self.w.writerow([row.get(k) for k in self.fields])
+        self.pending += 1
+        if self.pending >= self.flush_rows:
+            self.flush()
+        else:
+            self.tick()
+
+    def tick(self):
+        # call when idle too, so a slow stream still reaches disk every FLUSH_S
+        if self.pending and time.monotonic() - self.last_flush >= self.flush_s:
+            self.flush()
+
+    def flush(self, sync=False):
+        self.f.flush()
+        now = time.monotonic()
+        self.pending = 0
+        self.last_flush = now
+        if sync or self.fsync_s == 0 or (self.fsync_s > 0 and now - self.last_sync >= self.fsync_s):
+            os.fsync(self.f.fileno())
+            self.last_sync = now
+
+    def close(self):
+        if self.f.closed: return
+        self.flush(sync=self.fsync_s >= 0)
+        self.f.close()
+
+class DeviceClock:
+    """
+    Maps the board's `ms` counter to wall-clock time from one anchor instead of a
+    clock call per line. Every ANCHOR_REFRESH_S of device time the anchor is
+    compared with time.time(): small drift is slewed out (SLEW of it per check),
+    a board reset or an offset beyond RESYNC_S re-anchors immediately.
+    """
+    def __init__(self):
+        self.anchor_ms = self.last_ms = self.next_check_ms = None
+        self.anchor_wall = 0.0
+        self._sec, self._iso = None, None
+
+    def _sync(self, ms):
+        now = time.time()
+        if self.anchor_ms is None or ms < self.last_ms:
+            self.anchor_wall = now
+        else:
+            predicted = self.anchor_wall + (ms - self.anchor_ms) / 1000.0
+            off = now - predicted
+            self.anchor_wall = now if abs(off) > RESYNC_S else predicted + SLEW * off
+        self.anchor_ms = ms
+        self.next_check_ms = ms + ANCHOR_REFRESH_S * 1000
 
-def open_writer(path):
-    new = not os.path.exists(path)
-    f = open(path, "a", newline="")
-    w = csv.DictWriter(f, fieldnames=FIELDS)
-    if new: w.writeheader()
-    return f, w
+    def wall(self, ms):
+        if self.anchor_ms is None or ms < self.last_ms or ms >= self.next_check_ms:
+            self._sync(ms)
+        self.last_ms = ms
+        return self.anchor_wall + (ms - self.anchor_ms) / 1000.0
 
-def parse_line(line: str):
+    def iso(self, ms):
+        sec = int(self.wall(ms))
+        if sec != self._sec:   # format once per second, not per line
+            self._sec = sec
+            self._iso = datetime.datetime.fromtimestamp(sec).isoformat(timespec="seconds")
+        return self._iso
+
+def _now_iso():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+def parse_line(line: str, clock=None):
+    """
+    Parse one firmware line into a typed row (ints for ms/flags, floats for
+    signals). iso_ts comes from `clock` (a DeviceClock) when given, else from
+    the wall clock. Returns None for blank or malformed lines.
+    """
     line = line.strip()
     if not line: return None
-    row = {"iso_ts": datetime.datetime.now().isoformat(timespec="seconds")}
     # CSV from Arduino (preferred)
     if line[0] != "{":
         parts = line.split(",")
-        if len(parts) < 9 or not parts[0].isdigit(): return None
-        row.update({
-            "ms": parts[0], "temp_c": parts[1], "hum_pct": parts[2],
-            "heat_index_c": parts[3], "pir_raw": parts[4], "motion": parts[5],
-            "occupied": parts[6], "fidget": parts[7], "focused": parts[8],
-        })
+        if len(parts) < 9: return None
+        try:
+            ms = int(parts[0])
+            row = {"iso_ts": None, "ms": ms,
+                   "temp_c": float(parts[1]), "hum_pct": float(parts[2]),
+                   "heat_index_c": float(parts[3]), "pir_raw": int(parts[4]),
+                   "motion": int(parts[5]), "occupied": int(parts[6]),
+                   "fidget": float(parts[7]), "focused": int(parts[8])}
+        except ValueError:
+            return None
+        if ms < 0: return None
+        row["iso_ts"] = clock.iso(ms) if clock else _now_iso()
         return row
     # JSON fallback (if you flip OUTPUT_CSV to 0)
     try:
         obj = json.loads(line)
-        row.update({
-            "ms": obj.get("ms"), "temp_c": obj.get("temp_c"), "hum_pct": obj.get("hum_pct"),
-            "heat_index_c": obj.get("heat_index_c"), "pir_raw": obj.get("pir_raw"),
-            "motion": obj.get("motion"), "occupied": obj.get("occupied"),
-            "fidget": obj.get("fidget"), "focused": obj.get("focused"),
-        })
+        ms = obj.get("ms")
+        ms = None if ms is None else int(ms)
+        row = {"iso_ts": clock.iso(ms) if clock and ms is not None else _now_iso(), "ms": ms}
+        for k, cast in JSON_FIELDS:
+            v = obj.get(k)
+            row[k] = None if v is None else cast(v)
         return row
     except Exception:
         return None
 
-def main():
-    port = pick_port(PORT)
-    ser = serial.Serial(port, BAUD, timeout=2)
-    current_path = today_path()
-    f, w = open_writer(current_path)
-    try:
-        while True:
-            # rotate file daily
-            new_path = today_path()
-            if new_path != current_path:
-                f.close()
-                current_path = new_path
-                f, w = open_writer(current_path)
+class DeviceReader(threading.Thread):
+    """
+    Reads one serial port into its own daily CSV. With `device` set, rows are
+    tagged with it and written to OUTDIR/<device>/YYYY-MM-DD.csv. A stall only
+    idles this thread; a disconnect closes the port and retries every
+    RECONNECT_S until `stop` is set, without touching the other devices.
+    """
+    def __init__(self, port, device=None, stop=None):
+        super().__init__(name=f"serial-{device or port}", daemon=True)
+        self.port, self.device = port, device
+        self.stop = stop or threading.Event()
+        self.fields = FIELDS + ["device"] if device else FIELDS
+
+    def run(self):
+        self.path = today_path(self.device)
+        self.writer = BatchWriter(self.path, fields=self.fields)
+        self.detector = OnlineDetector(anomalies_path(self.path))
+        self.clock = DeviceClock()
+        try:
+            while not self.stop.is_set():
+                try:
+                    ser = serial.Serial(self.port, BAUD, timeout=READ_TIMEOUT_S)
+                except (serial.SerialException, OSError) as e:
+                    print(f"[{self.name}] open failed: {e}")
+                    self.stop.wait(RECONNECT_S)
+                    continue
+                try:
+                    self.pump(ser)
+                except (serial.SerialException, OSError) as e:
+                    print(f"[{self.name}] disconnected: {e}")
+                    self.writer.flush()
+                    self.stop.wait(RECONNECT_S)
+                finally:
+                    ser.close()
+        finally:
+            self.writer.close()
+
+    def pump(self, ser):
+        next_rotate = time.monotonic() + ROTATE_CHECK_S
+        while not self.stop.is_set():
+            # rotate file daily (checked once a second, not per line)
+            if time.monotonic() >= next_rotate:
+                next_rotate = time.monotonic() + ROTATE_CHECK_S
+                new_path = today_path(self.device)
+                if new_path != self.path:
+                    self.writer.close()
+                    self.path = new_path
+                    self.writer = BatchWriter(self.path, fields=self.fields)
+                    self.detector.path = anomalies_path(self.path)
             line = ser.readline().decode("utf-8", errors="ignore")
-            row = parse_line(line)
+            row = parse_line(line, self.clock)
             if row:
-                w.writerow(row); f.flush()
-    except KeyboardInterrupt:
-        pass
+                if self.device: row["device"] = self.device
+                self.writer.write(row)
+                for e in self.detector.feed(row):
+                    print(f"Anomaly ({self.device or self.port}):", e)
+            else:
+                self.writer.tick()
+
+def run_all(pattern, stop):
+    """Read every port matching `pattern` concurrently; new matches are picked up every RESCAN_S."""
+    readers = {}   # device id -> reader: macOS lists a board as both /dev/cu.X and /dev/tty.X
+    try:
+        while not stop.is_set():
+            for port in sorted(glob.glob(pattern)):
+                dev = device_id(port)
+                if dev not in readers:
+                    print(f"Using port: {port} (device {dev})")
+                    readers[dev] = DeviceReader(port, dev, stop)
+                    readers[dev].start()
+            if not readers:
+                print(f"No serial ports match {pattern}, waiting...")
+            stop.wait(RESCAN_S)
     finally:
-        try: f.close(); ser.close()
-        except: pass
+        stop.set()
+        for r in readers.values():
+            r.join()
+
+def main():
+    stop = threading.Event()
+    try:
+        if ALL_PORTS:
+            run_all(PORT, stop)
+        else:
+            DeviceReader(pick_port(PORT), stop=stop).run()
+    except KeyboardInterrupt:
+        stop.set()
 
 if __name__ == "__main__":
     main()